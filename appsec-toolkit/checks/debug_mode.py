@@ -1,68 +1,317 @@
+import ast
+import hashlib
+import io
 import os
 import re
+import tokenize
 
 # Common patterns indicating debug mode or development environment
 # We'll look in .py files and .env files primarily.
+# For .py files these regexes are only a fallback for sources that ast.parse rejects
+# (e.g. Python 2 code); parseable files are checked with the ast module instead.
 PYTHON_DEBUG_PATTERNS = [
-    re.compile(r"^\s*DEBUG\s*=\s*True", re.IGNORECASE),
-    re.compile(r"^\s*FLASK_DEBUG\s*=\s*1", re.IGNORECASE),
-    re.compile(r"^\s*FLASK_ENV\s*=\s*['"]development['"]\s*$", re.IGNORECASE),
+    re.compile(r"^\s*DEBUG\s*=\s*True", re.IGNORECASE),
+    re.compile(r"^\s*FLASK_DEBUG\s*=\s*1", re.IGNORECASE),
+    re.compile(r"""^\s*FLASK_ENV\s*=\s*['"]development['"]\s*$""", re.IGNORECASE),
     # Django specific settings.py often has DEBUG = True
     # For Django, also check if DJANGO_SETTINGS_MODULE might point to a dev settings file if possible,
     # but that's more complex. Sticking to direct DEBUG = True is a good start.
 ]
 
 ENV_DEBUG_PATTERNS = [
-    re.compile(r"^\s*DEBUG\s*=\s*True", re.IGNORECASE),
-    re.compile(r"^\s*ENVIRONMENT\s*=\s*development", re.IGNORECASE),
-    re.compile(r"^\s*APP_ENV\s*=\s*dev", re.IGNORECASE),
+    re.compile(r"^\s*DEBUG\s*=\s*True", re.IGNORECASE),
+    re.compile(r"^\s*ENVIRONMENT\s*=\s*development", re.IGNORECASE),
+    re.compile(r"^\s*APP_ENV\s*=\s*dev", re.IGNORECASE),
+    re.compile(r"^\s*FLASK_DEBUG\s*=\s*1", re.IGNORECASE),
+    re.compile(r"""^\s*FLASK_ENV\s*=\s*['"]?development""", re.IGNORECASE),
 ]
 
+# Names (compared case-insensitively) that enable debug mode when set to a truthy value,
+# whether assigned directly (DEBUG = True), as an attribute (app.debug = True), as a
+# mapping key (app.config["DEBUG"] = True) or as a keyword (app.run(debug=True)).
+DEBUG_SETTING_NAMES = {"debug", "flask_debug"}
+DEVELOPMENT_SETTING_NAMES = {"flask_env"}
+TRUTHY_VALUES = {True, 1, "1", "true", "yes", "on"}
+
+# Cheap byte-level prefilter, run on the lower-cased source: only lines that look like a debug
+# assignment or keyword argument (DEBUG = ..., debug=..., ["DEBUG"] = ..., 'development') are tokenized.
+# Whitespace between the name and "=" may include backslash line continuations.
+PREFILTER_WORDS = (b"debug", b"development")
+_GAP = rb"(?:\s|\\\r?\n)*"
+DEBUG_CANDIDATE = re.compile(rb"debug['\"]?" + _GAP + rb"\]?" + _GAP + rb"""(?::[^=\n]*)?=(?!=)|['"]development['"]""")
+
+# Only the top-level statement around a candidate line is parsed. A statement starts on a line
+# that begins in column 0 with anything except these (which continue the statement before them).
+STATEMENT_CONTINUATIONS = (b" ", b"\t", b"#", b")", b"]", b"}", b"else", b"elif", b"except", b"finally")
+# Skips comments and strings to tell whether a position is inside a triple-quoted string.
+_STRING_START = re.compile(rb"""#[^\n]*|\"\"\"|'''|"|'""")
+_STRING_END = {
+    b'"""': re.compile(rb'(?:[^"\\]|\\.|"(?!""))*"""', re.DOTALL),
+    b"'''": re.compile(rb"(?:[^'\\]|\\.|'(?!''))*'''", re.DOTALL),
+    b'"': re.compile(rb'(?:[^"\\\n]|\\.)*"?'),
+    b"'": re.compile(rb"(?:[^'\\\n]|\\.)*'?"),
+}
+
+# Parsed results keyed by a hash of the file contents. This is in-memory only: it saves
+# re-parsing identical (vendored, copied) files within one run, not across runs.
+_PARSE_CACHE = {}
+PARSE_CACHE_MAX_ENTRIES = 50000
+
+# Directories whose path contains any of these are not scanned
+SKIPPED_DIR_MARKERS = ("venv", "node_modules", ".git")
+
 # Files to check
 PYTHON_FILES = ('.py',)
 ENV_FILES = ('.env', 'config.env') # Add other common .env file names if needed
 
+
+def _is_truthy(node):
+    if isinstance(node, ast.Constant):
+        value = node.value.lower() if isinstance(node.value, str) else node.value
+        return value in TRUTHY_VALUES
+    # Keep the case-insensitive behaviour of the regex scan for odd spellings like `TrUe`.
+    return isinstance(node, ast.Name) and node.id.lower() == "true"
+
+
+def _is_development(node):
+    return isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value.lower() == "development"
+
+
+def _setting_name(target):
+    """Returns the lower-cased setting name a target assigns to, or None."""
+    if isinstance(target, ast.Name):
+        return target.id.lower()
+    if isinstance(target, ast.Attribute):
+        return target.attr.lower()
+    if isinstance(target, ast.Subscript):
+        key = target.slice
+        if isinstance(key, ast.Constant) and isinstance(key.value, str):
+            return key.value.lower()
+    return None
+
+
+def _enables_debug(node):
+    """Whether an Assign, AnnAssign or Call node sets a debug setting to an enabling value."""
+    if isinstance(node, ast.Call):
+        settings = [(keyword.arg.lower(), keyword.value) for keyword in node.keywords if keyword.arg is not None]
+    elif isinstance(node, ast.Assign):
+        settings = [(_setting_name(target), node.value) for target in node.targets]
+    elif isinstance(node, ast.AnnAssign) and node.value is not None:
+        settings = [(_setting_name(node.target), node.value)]
+    else:
+        return False
+    return any((name in DEBUG_SETTING_NAMES and _is_truthy(value)) or
+               (name in DEVELOPMENT_SETTING_NAMES and _is_development(value))
+               for name, value in settings)
+
+
+def _find_debug_settings(node, hit_lines, found):
+    """
+    Collects (first line, last line) of debug-enabling nodes under node, only descending into
+    nodes whose line range contains one of hit_lines, so most of the tree is never visited.
+    """
+    for child in ast.iter_child_nodes(node):
+        start = getattr(child, "lineno", None)
+        if start is None:
+            if not isinstance(child, ast.expr_context):
+                _find_debug_settings(child, hit_lines, found)  # e.g. arguments, comprehension
+            continue
+        end = child.end_lineno or start
+        if not any(start <= line <= end for line in hit_lines):
+            continue
+        if _enables_debug(child):
+            found.append((start, end))
+        _find_debug_settings(child, hit_lines, found)
+
+
+def _candidate_lines(source_bytes):
+    """
+    Returns the line numbers worth checking with ast. Lines matching DEBUG_CANDIDATE are
+    tokenized on their own; a hit only counts if it is part of a name or string token,
+    so mentions inside comments don't trigger a parse.
+    """
+    lowered = source_bytes.lower()
+    if not any(word in lowered for word in PREFILTER_WORDS):
+        return []
+
+    lines = []
+    line_no, counted_to = 1, 0
+    for match in DEBUG_CANDIDATE.finditer(lowered):
+        line_no += lowered.count(b"\n", counted_to, match.start())
+        counted_to = match.start()
+        if lines and lines[-1] == line_no:
+            continue
+        line_start = source_bytes.rfind(b"\n", 0, match.start()) + 1
+        line_end = source_bytes.find(b"\n", match.end())
+        line = source_bytes[line_start:line_end if line_end != -1 else len(source_bytes)]
+        try:
+            for token in tokenize.tokenize(io.BytesIO(line).readline):
+                if token.type in (tokenize.NAME, tokenize.STRING):
+                    text = token.string.lower()
+                    if "debug" in text or "development" in text:
+                        lines.append(line_no)
+                        break
+        except (tokenize.TokenError, SyntaxError):
+            lines.append(line_no)  # e.g. an unclosed bracket; let ast.parse (or the regex fallback) decide
+    return lines
+
+
+def _ends_inside_string(source_bytes):
+    """Whether source_bytes ends inside an unterminated triple-quoted string."""
+    pos = 0
+    while True:
+        match = _STRING_START.search(source_bytes, pos)
+        if match is None:
+            return False
+        quote = match.group()
+        if quote.startswith(b"#"):
+            pos = match.end()
+            continue
+        end = _STRING_END[quote].match(source_bytes, match.end())
+        if len(quote) == 3 and end is None:
+            return True
+        pos = end.end()
+
+
+def _statement_range(source_lines, line_no):
+    """Returns the (first, last) line numbers of the top-level statement containing line_no."""
+    def starts_statement(i):
+        line = source_lines[i - 1]
+        if i > 1 and source_lines[i - 2].rstrip(b"\r").endswith(b"\\"):
+            return False  # Continues the previous line after a backslash
+        return line.strip() != b"" and not line.startswith(STATEMENT_CONTINUATIONS)
+
+    first = line_no
+    while first > 1 and not starts_statement(first):
+        first -= 1
+    last = line_no
+    while last < len(source_lines) and not starts_statement(last + 1):
+        last += 1
+    return first, last
+
+
+def _parse_statements(source_bytes, hit_lines):
+    """
+    Parses only the top-level statements containing hit_lines, keeping their original line numbers.
+    Returns a list of ast.Module nodes, or None if the whole file needs parsing instead
+    (a statement starts inside a multi-line string, or doesn't parse on its own).
+    """
+    source_lines = source_bytes.split(b"\n")
+    trees = []
+    covered_to = 0
+    for line_no in hit_lines:
+        if line_no <= covered_to:
+            continue
+        first, last = _statement_range(source_lines, line_no)
+        if _ends_inside_string(b"\n".join(source_lines[:first - 1])):
+            return None
+        try:
+            tree = ast.parse(b"\n".join(source_lines[first - 1:last]))
+        except (SyntaxError, ValueError):
+            return None
+        trees.append(ast.increment_lineno(tree, first - 1))
+        covered_to = last
+    return trees
+
+
+def _scan_python_source(source_bytes):
+    """
+    Returns a list of (line number, finding) tuples for a Python source.
+    Results are cached by content hash.
+    """
+    key = hashlib.blake2b(source_bytes, digest_size=16).digest()
+    cached = _PARSE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    results = []
+    hit_lines = _candidate_lines(source_bytes)
+    if hit_lines:
+        text = source_bytes.decode("utf-8", errors="ignore")
+        lines = text.splitlines()
+        trees = _parse_statements(source_bytes, hit_lines)
+        if trees is None:
+            try:
+                trees = [ast.parse(source_bytes)]
+            except (SyntaxError, ValueError):
+                trees = None
+
+        if trees is not None:
+            found = []
+            for tree in trees:
+                _find_debug_settings(tree, hit_lines, found)
+            for start, end in sorted(set(found)):
+                # Report the full source lines (comments included), joined if the statement spans several.
+                results.append((start, " ".join(line.strip() for line in lines[start - 1:end])))
+        else:
+            for i, line in enumerate(lines, 1):
+                for pattern in PYTHON_DEBUG_PATTERNS:
+                    if pattern.search(line):
+                        results.append((i, line.strip()))
+
+    if len(_PARSE_CACHE) >= PARSE_CACHE_MAX_ENTRIES:
+        _PARSE_CACHE.clear()
+    _PARSE_CACHE[key] = results
+    return results
+
+
+def is_skipped_dir(root):
+    """Whether a directory is skipped (virtual environments, node_modules, .git) to speed up scanning."""
+    return any(marker in root for marker in SKIPPED_DIR_MARKERS)
+
+
+def scan_file_for_debug_settings(filepath):
+    """
+    Scans a single file for debug mode configurations.
+    Only Python and .env style files are checked; returns a list of findings.
+    """
+    findings = []
+    file = os.path.basename(filepath)
+    try:
+        if file.endswith(PYTHON_FILES):
+            with open(filepath, "rb") as f:
+                source_bytes = f.read()
+            for line_no, finding in _scan_python_source(source_bytes):
+                findings.append({
+                    "file": filepath,
+                    "line": line_no,
+                    "finding": finding,
+                    "type": "Python Debug Setting"
+                })
+        elif file.endswith(ENV_FILES) or file in ENV_FILES: # Check specific filenames like '.env'
+            with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
+                for i, line in enumerate(f, 1):
+                    for pattern in ENV_DEBUG_PATTERNS:
+                        if pattern.search(line):
+                            findings.append({
+                                "file": filepath,
+                                "line": i,
+                                "finding": line.strip(),
+                                "type": "Environment Config Debug Setting"
+                            })
+    except Exception as e:
+        # Silently ignore files that can't be opened or read, or log if needed
+        # print(f"Could not read file {filepath}: {e}")
+        pass # Or log this issue
+    return findings
+
+
 def scan_for_debug_settings(base_path):
     """
     Scans files in the given base_path for common debug mode configurations.
+    Python files are analysed with the ast module (after a tokenizer prefilter), so
+    settings split over several lines, app.run(debug=True) and app.config["DEBUG"] = True
+    are detected while strings and comments are not flagged.
     Returns a list of findings.
     """
     findings = []
     for root, _, files in os.walk(base_path):
         # Skip common virtual environment directories to speed up scanning
-        if "venv" in root or "node_modules" in root or ".git" in root:
+        if is_skipped_dir(root):
             continue
 
         for file in files:
-            filepath = os.path.join(root, file)
-            
-            try:
-                if file.endswith(PYTHON_FILES):
-                    with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
-                        for i, line in enumerate(f, 1):
-                            for pattern in PYTHON_DEBUG_PATTERNS:
-                                if pattern.search(line):
-                                    findings.append({
-                                        "file": filepath,
-                                        "line": i,
-                                        "finding": line.strip(),
-                                        "type": "Python Debug Setting"
-                                    })
-                elif file.endswith(ENV_FILES) or file in ENV_FILES: # Check specific filenames like '.env'
-                    with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
-                        for i, line in enumerate(f, 1):
-                            for pattern in ENV_DEBUG_PATTERNS:
-                                if pattern.search(line):
-                                    findings.append({
-                                        "file": filepath,
-                                        "line": i,
-                                        "finding": line.strip(),
-                                        "type": "Environment Config Debug Setting"
-                                    })
-            except Exception as e:
-                # Silently ignore files that can't be opened or read, or log if needed
-                # print(f"Could not read file {filepath}: {e}")
-                pass # Or log this issue
+            findings.extend(scan_file_for_debug_settings(os.path.join(root, file)))
                 
     return findings
 
@@ -1,28 +1,316 @@
+import glob
 import subprocess
 import json
 import os
+import re
+import tempfile
 
-# It's good practice to specify the path to requirements.txt if not in the current dir
-# For now, we assume it's in the base_path being scanned or the current working directory
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
 
-def check_dependencies(project_path):
+# Manifests are read in-process so that fully pinned projects can be audited with
+# `pip-audit --no-deps --disable-pip`, which skips the ephemeral virtualenv build.
+# Sources earlier in this order win when they disagree on a version.
+LOCKFILES = ("poetry.lock", "Pipfile.lock")
+REQUIREMENTS_GLOB = "requirements*.txt"
+PYPROJECT_FILE = "pyproject.toml"
+SITE_PACKAGES_GLOBS = (
+    os.path.join("lib", "python*", "site-packages"),  # Relative to a virtualenv root, on POSIX
+    os.path.join("Lib", "site-packages"),             # Relative to a virtualenv root, on Windows
+)
+
+REQUIREMENT_LINE = re.compile(
+    r"^(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*(?P<spec>[^;]*?)\s*(?:;.*)?$"
+)
+LOCAL_REQUIREMENT = re.compile(r"^(?:[./~]|[A-Za-z]:[\\/])|file:")
+VCS_REQUIREMENT = re.compile(r"^(?:-e|--editable)?(?:\s+|=)?(?P<url>(?:git|hg|svn|bzr)\+\S+)$")
+PINNED_SPEC = re.compile(r"^===?\s*(?P<version>[^\s,*]+)$")
+POETRY_EXACT_VERSION = re.compile(r"^(?:==)?\s*(?P<version>\d[A-Za-z0-9.!+_-]*)$")
+
+
+def normalize_name(name):
+    """Normalizes a distribution name as described in PEP 503."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _expect(value, expected_type, description):
+    """Returns value if it has the expected type, else raises ValueError naming the malformed part."""
+    if not isinstance(value, expected_type):
+        names = " or ".join(t.__name__ for t in (expected_type if isinstance(expected_type, tuple) else (expected_type,)))
+        raise ValueError(f"{description} should be a {names}, not {type(value).__name__}")
+    return value
+
+
+def _vcs_requirement(name, url):
+    """Returns a PEP 508 direct reference for a VCS or URL dependency, for pip-audit to resolve."""
+    return f"{name} @ {url}" if name else url
+
+
+def _parse_requirement(requirement):
     """
-    Checks for known vulnerabilities in project dependencies using pip-audit.
-    pip-audit needs to be installed in the environment where this script runs.
-    It looks for a requirements.txt file in the project_path.
+    Parses a single PEP 508 requirement string.
+    Returns (name, version) where version is None unless the requirement is pinned with ==.
     """
-    findings = []
-    requirements_file = os.path.join(project_path, "requirements.txt")
+    match = REQUIREMENT_LINE.match(requirement.strip())
+    if not match:
+        return None, None
+    pinned = PINNED_SPEC.match(match.group("spec"))
+    return normalize_name(match.group("name")), pinned.group("version") if pinned else None
+
+
+def parse_requirements_file(path, _seen=None):
+    """
+    Parses a pip requirements file, following -r/--requirement includes.
+    Hashes, comments and other pip options are ignored, as are editable and local-path
+    requirements (they aren't on PyPI, so there is nothing to audit). VCS requirements,
+    editable or not, are returned as unpinned "name @ url" requirements.
+    Returns a tuple of ({name: version} for pinned requirements, [unpinned requirement strings]).
+    """
+    _seen = set() if _seen is None else _seen
+    real_path = os.path.realpath(path)
+    if real_path in _seen:
+        return {}, []
+    _seen.add(real_path)
+
+    pinned, unpinned = {}, []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        # Join backslash continuations, which pip-compile uses for --hash lines.
+        content = re.sub(r"\\\r?\n", " ", f.read())
+
+    for line in content.splitlines():
+        line = re.sub(r"(^|\s)#.*$", "", line).strip()
+        line = re.sub(r"\s--hash[=\s]\S+", "", line).strip()
+        if not line:
+            continue
+
+        include = re.match(r"^(?:-r|--requirement)(?:\s+|=)(\S+)$", line)
+        if include:
+            included_path = os.path.join(os.path.dirname(path), include.group(1))
+            included_pinned, included_unpinned = parse_requirements_file(included_path, _seen)
+            for name, version in included_pinned.items():
+                pinned.setdefault(name, version)
+            unpinned.extend(included_unpinned)
+            continue
+        vcs = VCS_REQUIREMENT.match(line)
+        if vcs:
+            url, _, fragment = vcs.group("url").partition("#")
+            egg = re.search(r"(?:^|&)egg=([^&]+)", fragment)
+            unpinned.append(_vcs_requirement(egg.group(1) if egg else None, url))
+            continue
+        if line.startswith("-"):
+            continue  # Local editables, index URLs, constraints files and other pip options
+        if LOCAL_REQUIREMENT.search(line):
+            continue
+
+        name, version = _parse_requirement(line)
+        if version is None:
+            unpinned.append(line)
+        else:
+            pinned.setdefault(name, version)
+    return pinned, unpinned
+
+
+def _load_toml(path):
+    if tomllib is None:
+        raise ValueError("reading TOML requires Python 3.11+ or the 'tomli' package")
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def parse_poetry_lock(path):
+    """
+    Parses a poetry.lock file. Locked packages from PyPI (or another index) are pinned;
+    git and url packages are returned as unpinned "name @ url" requirements, and
+    directory and file packages are skipped since they are local.
+    """
+    data = _load_toml(path)
+    pinned, unpinned = {}, []
+    for package in _expect(data.get("package", []), list, "[[package]]"):
+        package = _expect(package, dict, "[[package]] entry")
+        name = _expect(package.get("name", ""), str, "package name")
+        version = _expect(package.get("version", ""), str, f"version of {name}")
+        source = _expect(package.get("source", {}), dict, f"source of {name}")
+        source_type = source.get("type")
+        if not name or source_type in ("directory", "file"):
+            continue
+        if source_type == "git":
+            reference = source.get("resolved_reference") or source.get("reference")
+            url = _expect(source.get("url"), str, f"git url of {name}")
+            unpinned.append(_vcs_requirement(name, f"git+{url}" + (f"@{reference}" if reference else "")))
+        elif source_type == "url":
+            unpinned.append(_vcs_requirement(name, _expect(source.get("url"), str, f"url of {name}")))
+        elif version:
+            pinned.setdefault(normalize_name(name), version)
+    return pinned, unpinned
+
+
+def parse_pipfile_lock(path):
+    """Parses a Pipfile.lock file, covering both the default and develop sections."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = _expect(json.load(f), dict, "Pipfile.lock")
+    pinned, unpinned = {}, []
+    for section in ("default", "develop"):
+        for name, info in _expect(data.get(section) or {}, dict, f'"{section}"').items():
+            info = _expect(info, dict, f'"{name}" in "{section}"')
+            pinned_spec = PINNED_SPEC.match(_expect(info.get("version", ""), str, f"version of {name}"))
+            if pinned_spec:
+                pinned.setdefault(normalize_name(name), pinned_spec.group("version"))
+            elif info.get("git"):
+                unpinned.append(f"{name} @ git+{info['git']}" + (f"@{info['ref']}" if info.get("ref") else ""))
+            # Path and file dependencies are local, so there is nothing to audit
+    return pinned, unpinned
+
+
+def parse_pyproject(path):
+    """
+    Parses PEP 621 ([project]) and Poetry ([tool.poetry]) dependency tables in a pyproject.toml.
+    Only exact pins are reported as pinned. Unpinned PEP 621 requirements are returned as written;
+    Poetry constraints (e.g. ^1.2) aren't pip syntax, so only the package name is returned for those.
+    Poetry git and url dependencies become "name @ url" requirements; path dependencies are skipped.
+    """
+    data = _load_toml(path)
+    pinned, unpinned = {}, []
+
+    project = _expect(data.get("project", {}), dict, "[project]")
+    requirements = list(_expect(project.get("dependencies", []), list, "project.dependencies"))
+    for extra, extra_requirements in _expect(project.get("optional-dependencies", {}), dict,
+                                             "project.optional-dependencies").items():
+        requirements.extend(_expect(extra_requirements, list, f"optional-dependencies.{extra}"))
+    for requirement in requirements:
+        requirement = _expect(requirement, str, "dependency")
+        name, version = _parse_requirement(requirement)
+        if name is None or LOCAL_REQUIREMENT.search(requirement.split("@", 1)[-1].strip()):
+            continue
+        if version is None:
+            unpinned.append(requirement)
+        else:
+            pinned.setdefault(name, version)
 
-    if not os.path.exists(requirements_file):
-        return {"error": "requirements.txt not found in the specified path.", "vulnerabilities": []}
+    poetry = _expect(_expect(data.get("tool", {}), dict, "[tool]").get("poetry", {}), dict, "[tool.poetry]")
+    tables = [poetry.get("dependencies", {}), poetry.get("dev-dependencies", {})]
+    for group_name, group in _expect(poetry.get("group", {}), dict, "[tool.poetry.group]").items():
+        tables.append(_expect(group, dict, f"group {group_name}").get("dependencies", {}))
+    for table in tables:
+        for name, constraint in _expect(table, dict, "Poetry dependency table").items():
+            if name.lower() == "python":
+                continue
+            _expect(constraint, (str, dict, list), f"constraint for {name}")
+            if isinstance(constraint, dict):
+                if "path" in constraint:
+                    continue  # Local path dependency
+                if constraint.get("git"):
+                    reference = constraint.get("rev") or constraint.get("tag") or constraint.get("branch")
+                    unpinned.append(_vcs_requirement(name, f"git+{constraint['git']}" + (f"@{reference}" if reference else "")))
+                    continue
+                if constraint.get("url"):
+                    unpinned.append(_vcs_requirement(name, constraint["url"]))
+                    continue
+                constraint = constraint.get("version", "")
+            exact = POETRY_EXACT_VERSION.match(constraint) if isinstance(constraint, str) else None
+            if exact:
+                pinned.setdefault(normalize_name(name), exact.group("version"))
+            else:
+                unpinned.append(normalize_name(name))
+    return pinned, unpinned
+
+
+def parse_site_packages(site_packages_dir):
+    """
+    Reads Name/Version from the METADATA of every *.dist-info directory in site_packages_dir.
+    Packages installed from a local path or URL (editable installs of the project itself,
+    locally built private packages) have a direct_url.json and are skipped.
+    """
+    pinned = {}
+    for metadata_path in sorted(glob.glob(os.path.join(site_packages_dir, "*.dist-info", "METADATA"))):
+        if os.path.exists(os.path.join(os.path.dirname(metadata_path), "direct_url.json")):
+            continue
+        name = version = None
+        with open(metadata_path, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                if not line.strip():
+                    break  # End of the header block; the rest is the long description
+                if line.startswith("Name:"):
+                    name = line.split(":", 1)[1].strip()
+                elif line.startswith("Version:"):
+                    version = line.split(":", 1)[1].strip()
+        if name and version:
+            pinned.setdefault(normalize_name(name), version)
+    return pinned, []
+
+
+def find_site_packages(project_path):
+    """Returns site-packages directories of virtualenvs inside project_path (or project_path itself)."""
+    candidates = []
+    if not os.path.isdir(project_path):
+        return candidates
+    if glob.glob(os.path.join(project_path, "*.dist-info")):
+        candidates.append(project_path)
+    # os.listdir rather than a "*" glob so hidden virtualenvs such as .venv are found too.
+    for entry in sorted(os.listdir(project_path)):
+        env_root = os.path.join(project_path, entry)
+        if os.path.isdir(env_root):
+            for pattern in SITE_PACKAGES_GLOBS:
+                candidates.extend(sorted(glob.glob(os.path.join(env_root, pattern))))
+    return candidates
+
+
+def collect_pinned_dependencies(project_path):
+    """
+    Builds the exact (name, version) set for a project from its manifests, without resolving anything.
+    Returns a dictionary with "pinned" ({name: version}), "unpinned" (names that no source pins),
+    "unpinned_requirements" (requirement strings for those names, for pip-audit to resolve),
+    "sources" (manifests that were read) and "errors" (manifests that could not be parsed).
+    """
+    sources = []
+    for lockfile, parser in zip(LOCKFILES, (parse_poetry_lock, parse_pipfile_lock)):
+        sources.append((os.path.join(project_path, lockfile), parser))
+    for requirements_file in sorted(glob.glob(os.path.join(project_path, REQUIREMENTS_GLOB))):
+        sources.append((requirements_file, parse_requirements_file))
+    sources.append((os.path.join(project_path, PYPROJECT_FILE), parse_pyproject))
+    for site_packages_dir in find_site_packages(project_path):
+        sources.append((site_packages_dir, parse_site_packages))
+
+    result = {"pinned": {}, "unpinned": [], "unpinned_requirements": [], "sources": [], "errors": []}
+    unpinned = {}
+    for path, parser in sources:
+        if not os.path.exists(path):
+            continue
+        try:
+            pinned_here, unpinned_here = parser(path)
+        except (OSError, ValueError) as e:
+            result["errors"].append(f"{path}: {e}")
+            continue
+        result["sources"].append(path)
+        for name, version in pinned_here.items():
+            result["pinned"].setdefault(name, version)
+        for requirement in unpinned_here:
+            # A VCS URL without an #egg= name is keyed by the URL itself.
+            name = requirement if VCS_REQUIREMENT.match(requirement) else _parse_requirement(requirement)[0] or requirement
+            unpinned.setdefault(name, requirement)
+
+    leftovers = sorted(name for name in unpinned if name not in result["pinned"])
+    result["unpinned"] = leftovers
+    result["unpinned_requirements"] = [unpinned[name] for name in leftovers]
+    return result
+
+
+def _run_pip_audit(audit_args):
+    """
+    Runs pip-audit with the given arguments (plus --json) and parses its output.
+    Returns a dictionary in the format returned by check_dependencies.
+    """
+    findings = []
 
     try:
-        # Using --json for structured output, and -r for the requirements file.
+        # Using --json for structured output.
         # We must ensure pip-audit is installed where this toolkit is run.
-        # Consider adding error handling for pip-audit not being found.
         process = subprocess.run(
-            ["pip-audit", "-r", requirements_file, "--json", "--strict"],
+            ["pip-audit", *audit_args, "--json"],
             capture_output=True,
             text=True,
             check=False # Don't raise exception on non-zero exit, parse output instead
@@ -78,6 +366,63 @@ def check_dependencies(project_path):
     return {"vulnerabilities": findings}
 
 
+def _audit_requirements(requirements, audit_args):
+    """Writes requirements to a temporary requirements file and runs pip-audit on it."""
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", prefix="appsec-requirements-", delete=False) as f:
+        for requirement in requirements:
+            f.write(f"{requirement}\n")
+        requirements_file = f.name
+    try:
+        return _run_pip_audit(["-r", requirements_file, *audit_args])
+    finally:
+        os.unlink(requirements_file)
+
+
+def check_dependencies(project_path):
+    """
+    Checks for known vulnerabilities in project dependencies using pip-audit.
+    pip-audit needs to be installed in the environment where this script runs.
+
+    Pinned versions are read in-process from requirements*.txt, poetry.lock, Pipfile.lock,
+    pyproject.toml and any virtualenv site-packages in the project_path, and audited with
+    --no-deps --disable-pip so no virtual environment is built. Only requirements that no
+    manifest pins are handed to pip-audit for resolution, as a separate step.
+    """
+    manifest = collect_pinned_dependencies(project_path)
+
+    if not manifest["sources"]:
+        error = "requirements.txt not found in the specified path (and no lockfile, pyproject.toml or site-packages either)."
+        if manifest["errors"]:
+            error += f" Unreadable manifests: {'; '.join(manifest['errors'])}"
+        return {"error": error, "vulnerabilities": []}
+
+    audits = []
+    if manifest["pinned"]:
+        # No --strict: packages that aren't on PyPI (private or vendored) are skipped rather than failing the audit.
+        pins = [f"{name}=={version}" for name, version in sorted(manifest["pinned"].items())]
+        audits.append(_audit_requirements(pins, ["--no-deps", "--disable-pip"]))
+    if manifest["unpinned_requirements"]:
+        # Only the leftovers need resolving, which makes pip-audit build a virtual environment.
+        audits.append(_audit_requirements(manifest["unpinned_requirements"], ["--strict"]))
+
+    errors = [audit["error"] for audit in audits if audit.get("error")]
+    vulnerabilities = [vuln for audit in audits for vuln in audit.get("vulnerabilities", [])]
+    if errors:
+        results = {"error": "; ".join(errors), "vulnerabilities": vulnerabilities}
+    elif vulnerabilities:
+        results = {"vulnerabilities": vulnerabilities}
+    elif audits:
+        results = {"success": "No vulnerabilities found by pip-audit.", "vulnerabilities": []}
+    else:
+        results = {"success": "No dependencies to audit.", "vulnerabilities": []}
+
+    if manifest["unpinned"]:
+        results["unpinned"] = manifest["unpinned"]
+    if manifest["errors"]:
+        results["manifest_errors"] = manifest["errors"]
+    return results
+
+
 if __name__ == '__main__':
     # For local testing, you'd need a sample project with a requirements.txt
     # And pip-audit installed.
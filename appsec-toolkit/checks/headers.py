@@ -1,4 +1,16 @@
+import codecs
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib import robotparser
+from urllib.parse import urldefrag, urljoin, urlparse
+
 import requests
+from requests.adapters import HTTPAdapter
 
 COMMON_SECURITY_HEADERS = [
     "Content-Security-Policy",
@@ -20,9 +32,146 @@ RECOMMENDED_MISSING_ADVICE = {
     "X-XSS-Protection": "This header is largely deprecated as modern browsers have built-in XSS filtering. CSP is the recommended replacement. If set, it should be '1; mode=block'."
 }
 
-def check_security_headers(url):
+USER_AGENT = 'AppSec-Toolkit-Scanner/1.0'
+
+# Response metadata cache for repeated single-URL checks. Within the TTL a cached result is
+# reused without any request; after it, the entry is revalidated with If-None-Match /
+# If-Modified-Since (or HEAD when the response had no validators), so only headers are transferred.
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "appsec-toolkit", "headers"
+)
+DEFAULT_CACHE_TTL = 15 * 60  # seconds
+
+# Crawl mode only reads HTML bodies, and only this far, to find links.
+MAX_LINK_SCAN_BYTES = 256 * 1024
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+LINK_ATTRIBUTES = {"a": "href", "link": "href", "script": "src", "img": "src", "iframe": "src", "form": "action"}
+
+
+def _evaluate_headers(response_headers_lower, results):
+    """Fills in found/missing headers and recommendations from a dict of lower-cased response headers."""
+    for header in COMMON_SECURITY_HEADERS:
+        if header.lower() in response_headers_lower:
+            results["found_headers"][header] = response_headers_lower[header.lower()]
+        else:
+            results["missing_headers"][header] = RECOMMENDED_MISSING_ADVICE.get(header, "No specific recommendation available.")
+            results["recommendations"].append(f"Missing {header}: {RECOMMENDED_MISSING_ADVICE.get(header, '')}")
+
+
+def _cache_path(cache_dir, url):
+    return os.path.join(cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def _is_valid_cache_entry(entry):
+    return (isinstance(entry, dict)
+            and isinstance(entry.get("checked_at"), (int, float))
+            and isinstance(entry.get("headers"), dict)
+            and isinstance(entry.get("final_url"), str)
+            and isinstance(entry.get("redirect_chain"), list)
+            and len(entry["redirect_chain"]) > 0)
+
+
+def _load_cache_entry(cache_dir, url):
+    """
+    Loads the cache entry for url, following the alias stored for a URL that redirected.
+    Missing, unreadable or malformed entries are all treated as a cache miss (None).
+    """
+    for _ in range(2):
+        try:
+            with open(_cache_path(cache_dir, url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if isinstance(entry, dict) and isinstance(entry.get("alias"), str):
+            url = entry["alias"]
+            continue
+        return entry if _is_valid_cache_entry(entry) else None
+    return None
+
+
+def _save_cache_entry(cache_dir, requested_url, entry):
+    """Stores entry keyed by its final URL, plus an alias from requested_url if it redirected."""
+    records = {entry["final_url"]: entry}
+    if requested_url != entry["final_url"]:
+        records[requested_url] = {"alias": entry["final_url"]}
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for url, record in records.items():
+            # Write to a temporary file first so concurrent runs never read a partial entry.
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, _cache_path(cache_dir, url))
+    except OSError:
+        pass  # The cache is best effort; a failed write only means the next check does a full request
+
+
+def _make_cache_entry(url, final_url, redirect_chain, response_headers_lower):
+    return {
+        "url": url,
+        "final_url": final_url,
+        "redirect_chain": redirect_chain,
+        "headers": response_headers_lower,
+        "etag": response_headers_lower.get("etag"),
+        "last_modified": response_headers_lower.get("last-modified"),
+        "checked_at": time.time()
+    }
+
+
+def _redirect_unchanged(url, entry, request_headers):
+    """
+    Whether url still redirects the way the cached redirect_chain says it did.
+    Only the first hop is checked (with a HEAD that doesn't follow redirects); that is
+    where e.g. a dropped http -> https redirect shows up.
+    """
+    redirect_chain = entry["redirect_chain"]
+    if entry.get("url") != url or len(redirect_chain) < 2:
+        return False  # The entry was stored for another URL redirecting to the same place
+    response = requests.head(url, headers=request_headers, timeout=10, allow_redirects=False)
+    if response.status_code not in (301, 302, 303, 307, 308):
+        return False
+    location = urldefrag(urljoin(url, response.headers.get("location", "")))[0]
+    return location == urldefrag(redirect_chain[1])[0]
+
+
+def _revalidate(url, entry, request_headers):
+    """
+    Revalidates a stale cache entry for url without downloading a body. If url redirected,
+    the redirect itself is checked first, then the final URL is revalidated.
+    Returns (current lower-cased headers, whether the server said 304 Not Modified),
+    or (None, False) if a full request is needed, e.g. because the redirects changed.
+    """
+    if url != entry["final_url"] and not _redirect_unchanged(url, entry, request_headers):
+        return None, False
+
+    conditional_headers = dict(request_headers)
+    if entry.get("etag"):
+        conditional_headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        conditional_headers["If-Modified-Since"] = entry["last_modified"]
+
+    if len(conditional_headers) == len(request_headers):
+        response = requests.head(entry["final_url"], headers=request_headers, timeout=10, allow_redirects=False)
+    else:
+        response = requests.get(entry["final_url"], headers=conditional_headers, timeout=10,
+                                allow_redirects=False, stream=True)
+        response.close()
+
+    response_headers_lower = {k.lower(): v for k, v in response.headers.items()}
+    if response.status_code == 304:
+        # A 304 may leave out unchanged headers, so it updates the stored set rather than replacing it.
+        return {**entry["headers"], **response_headers_lower}, True
+    if 200 <= response.status_code < 300:
+        return response_headers_lower, False
+    return None, False
+
+
+def check_security_headers(url, cache_dir=None, cache_ttl=DEFAULT_CACHE_TTL):
     """
     Checks a given URL for common security headers.
+    If cache_dir is given, response metadata is cached there and reused or revalidated
+    on later checks (results then include "cached": True when nothing changed).
     Returns a dictionary with found and missing headers, along with advice.
     """
     results = {
@@ -34,18 +183,32 @@ def check_security_headers(url):
     
     try:
         # Add a common user-agent to mimic a browser
-        headers = {'User-Agent': 'AppSec-Toolkit-Scanner/1.0'}
-        response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-        
-        # Normalize header names to lower case for consistent checking
-        response_headers_lower = {k.lower(): v for k, v in response.headers.items()}
+        headers = {'User-Agent': USER_AGENT}
+        entry = _load_cache_entry(cache_dir, url) if cache_dir else None
+        response_headers_lower = None
 
-        for header in COMMON_SECURITY_HEADERS:
-            if header.lower() in response_headers_lower:
-                results["found_headers"][header] = response_headers_lower[header.lower()]
-            else:
-                results["missing_headers"][header] = RECOMMENDED_MISSING_ADVICE.get(header, "No specific recommendation available.")
-                results["recommendations"].append(f"Missing {header}: {RECOMMENDED_MISSING_ADVICE.get(header, '')}")
+        if entry and time.time() - entry["checked_at"] < cache_ttl:
+            response_headers_lower = entry["headers"]
+            results["cached"] = True
+        elif entry:
+            response_headers_lower, not_modified = _revalidate(url, entry, headers)
+            if response_headers_lower is not None:
+                results["cached"] = not_modified
+                entry = _make_cache_entry(url, entry["final_url"], entry["redirect_chain"], response_headers_lower)
+                _save_cache_entry(cache_dir, url, entry)
+
+        if response_headers_lower is None:
+            # Only the headers are needed, so stream and close without downloading the body.
+            response = requests.get(url, headers=headers, timeout=10, allow_redirects=True, stream=True)
+            response.close()
+
+            # Normalize header names to lower case for consistent checking
+            response_headers_lower = {k.lower(): v for k, v in response.headers.items()}
+            if cache_dir:
+                redirect_chain = [r.url for r in response.history] + [response.url]
+                _save_cache_entry(cache_dir, url, _make_cache_entry(url, response.url, redirect_chain, response_headers_lower))
+
+        _evaluate_headers(response_headers_lower, results)
 
     except requests.exceptions.RequestException as e:
         results["error"] = f"Could not connect to {url}. Error: {e}"
@@ -54,6 +217,221 @@ def check_security_headers(url):
         
     return results
 
+
+class _LinkExtractor(HTMLParser):
+    """Collects link targets (href/src/action attributes) from an HTML document."""
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        attribute = LINK_ATTRIBUTES.get(tag)
+        if attribute:
+            self.links.extend(value for name, value in attrs if name == attribute and value)
+
+
+def _origin(url):
+    parsed = urlparse(url)
+    return parsed.scheme, parsed.netloc.lower()
+
+
+def _resolve_link(base_url, link):
+    """Returns (absolute URL without fragment, its origin), or None for a malformed link such as http://[broken/."""
+    try:
+        absolute = urldefrag(urljoin(base_url, link))[0]
+        return absolute, _origin(absolute)
+    except ValueError:
+        return None
+
+
+def _make_session(max_workers):
+    """A session whose connection pool lets max_workers fetches reuse connections to the crawled origin."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=max_workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def _fetch_page(url, extract_links, session=None):
+    """
+    Fetches a page for crawl mode, keeping only its security headers.
+    The body is streamed, and only read (up to MAX_LINK_SCAN_BYTES) when links are needed from an HTML page.
+    Redirects are not followed here; their target is returned as "location" for the crawler to queue.
+    Pass a session to reuse connections across fetches.
+    """
+    page = {"url": url, "security_headers": {}, "links": []}
+    try:
+        response = (session or requests).get(url, headers={'User-Agent': USER_AGENT}, timeout=10,
+                                             allow_redirects=False, stream=True)
+    except requests.exceptions.RequestException as e:
+        page["error"] = f"Could not connect to {url}. Error: {e}"
+        return page
+
+    try:
+        page["status"] = response.status_code
+        if response.is_redirect:
+            page["location"] = response.headers["location"]
+            return page
+        response_headers_lower = {k.lower(): v for k, v in response.headers.items()}
+        for header in COMMON_SECURITY_HEADERS:
+            if header.lower() in response_headers_lower:
+                page["security_headers"][header.lower()] = response_headers_lower[header.lower()]
+
+        content_type = response_headers_lower.get("content-type", "").split(";")[0].strip().lower()
+        if extract_links and content_type in HTML_CONTENT_TYPES:
+            extractor = _LinkExtractor()
+            try:
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="ignore")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+            bytes_read = 0
+            for chunk in response.iter_content(chunk_size=16 * 1024):
+                extractor.feed(decoder.decode(chunk))
+                bytes_read += len(chunk)
+                if bytes_read >= MAX_LINK_SCAN_BYTES:
+                    break
+            page["links"] = extractor.links
+    except requests.exceptions.RequestException as e:
+        page["error"] = f"Could not read {url}. Error: {e}"
+    finally:
+        response.close()
+    return page
+
+
+def _load_robots(start_url, session=None):
+    """Fetches robots.txt for the start URL's origin. Unreachable or missing files allow everything."""
+    robots_url = urljoin(start_url, "/robots.txt")
+    parser = robotparser.RobotFileParser(robots_url)
+    try:
+        response = (session or requests).get(robots_url, headers={'User-Agent': USER_AGENT}, timeout=10)
+    except requests.exceptions.RequestException:
+        parser.allow_all = True
+        return parser
+    # Same status handling as RobotFileParser.read()
+    if response.status_code in (401, 403):
+        parser.disallow_all = True
+    elif response.status_code >= 400:
+        parser.allow_all = True
+    else:
+        parser.parse(response.text.splitlines())
+    return parser
+
+
+def _route_patterns(paths):
+    """Collapses paths that share a first segment into "/segment/*"; other paths are kept as they are."""
+    groups = {}
+    for path in paths:
+        segments = path.strip("/").split("/")
+        prefix = "/" + segments[0] if len(segments) > 1 else None
+        groups.setdefault(prefix, []).append(path)
+
+    patterns = []
+    for prefix, group in groups.items():
+        if prefix is not None and len(group) > 1:
+            patterns.append(prefix + "/*")
+        else:
+            patterns.extend(group)
+    return sorted(set(patterns))
+
+
+def crawl_security_headers(start_url, max_depth=2, max_pages=50, max_workers=8, respect_robots=True):
+    """
+    Crawls same-origin links from start_url (breadth first, up to max_depth links away and max_pages
+    fetches, max_workers at a time over one pooled session) and checks the security headers of every page found.
+    Malformed links are skipped.
+    Pages with identical security headers are grouped, so the result lists each distinct
+    header configuration once ("profiles"), along with the routes that serve it.
+    If the start URL redirects to another origin (e.g. http -> https), that origin is crawled instead.
+    """
+    results = {
+        "url": start_url,
+        "pages_crawled": 0,
+        "profiles": [],
+        "skipped_by_robots": [],
+        "errors": []
+    }
+    origin = _origin(start_url)
+    session = _make_session(max_workers)
+    robots = _load_robots(start_url, session) if respect_robots else None
+
+    start_url = urldefrag(start_url)[0]
+    seen = {start_url}
+    frontier = []
+    if robots and not robots.can_fetch(USER_AGENT, start_url):
+        results["skipped_by_robots"].append(start_url)
+    else:
+        frontier.append(start_url)
+
+    pages = []
+    fetched = 0
+    start_chain = {start_url}  # The start URL and the redirects it leads through
+    with session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for depth in range(max_depth + 1):
+            batch = frontier[:max_pages - fetched]
+            frontier = []
+            extract_links = depth < max_depth
+
+            # Redirect targets are fetched at the same depth as the URL that redirected to them.
+            while batch:
+                fetched += len(batch)
+                redirect_targets = []
+                for page in executor.map(_fetch_page, batch, [extract_links] * len(batch), [session] * len(batch)):
+                    if page.get("error"):
+                        results["errors"].append(page["error"])
+                        continue
+
+                    if "location" in page:
+                        target = _resolve_link(page["url"], page["location"])
+                        if target is None:
+                            results["errors"].append(f"Malformed redirect from {page['url']}: {page['location']}")
+                            continue
+                        if page["url"] in start_chain:
+                            start_chain.add(target[0])
+                            if target[1] != origin:
+                                # The start URL moved (http -> https, apex -> www): crawl the site it landed on.
+                                origin = target[1]
+                                robots = _load_robots(target[0], session) if respect_robots else None
+                        links, queue = [target], redirect_targets
+                    else:
+                        pages.append(page)
+                        links = [_resolve_link(page["url"], link) for link in page["links"]]
+                        queue = frontier
+
+                    for link in links:
+                        if link is None:
+                            continue  # Malformed href
+                        absolute, link_origin = link
+                        if link_origin != origin or absolute in seen:
+                            continue
+                        seen.add(absolute)
+                        if robots and not robots.can_fetch(USER_AGENT, absolute):
+                            results["skipped_by_robots"].append(absolute)
+                            continue
+                        queue.append(absolute)
+                batch = redirect_targets[:max_pages - fetched]
+
+    profiles = {}
+    for page in pages:
+        profile_key = tuple(page["security_headers"].get(header.lower()) for header in COMMON_SECURITY_HEADERS)
+        profiles.setdefault(profile_key, []).append(page)
+
+    for profile_pages in sorted(profiles.values(), key=len, reverse=True):
+        profile = {
+            "found_headers": {},
+            "missing_headers": {},
+            "recommendations": []
+        }
+        _evaluate_headers(profile_pages[0]["security_headers"], profile)
+        profile["routes"] = sorted({urlparse(page["url"]).path or "/" for page in profile_pages})
+        profile["route_patterns"] = _route_patterns(profile["routes"])
+        results["profiles"].append(profile)
+
+    results["pages_crawled"] = len(pages)
+    return results
+
 if __name__ == '__main__':
     # Example usage:
     # test_url = "https://www.google.com" # Replace with a site you want to test, or a local test server
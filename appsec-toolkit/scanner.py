@@ -1,24 +1,141 @@
 # appsec-toolkit/scanner.py
 import argparse
+import multiprocessing
+import os
 from checks import secrets, headers, debug_mode, dependencies # Import the new dependencies module
+from utils import distributed
+
+def collect_scan_files(base_path):
+    """
+    Lists the files the secrets and debug mode checks look at, so they can be split into work units.
+    Paths are absolute, so workers started from another directory (or machine, via a shared mount) can open them.
+    """
+    paths = []
+    for root, _, files in os.walk(os.path.abspath(base_path)):
+        for file in files:
+            if file.endswith(secrets.SECRET_FILE_EXTENSIONS + debug_mode.PYTHON_FILES + debug_mode.ENV_FILES) \
+                    or file in debug_mode.ENV_FILES:
+                paths.append(os.path.join(root, file))
+    return paths
+
+def scan_files(paths):
+    """
+    Runs the per-file checks (secrets, debug mode) on one work unit. Used by distributed workers.
+    Returns (findings, errors); a file that is missing or can't be read is reported in errors
+    rather than scanned, so it doesn't pass for a file with no findings.
+    """
+    findings, errors = [], []
+    for path in paths:
+        try:
+            with open(path, "rb"):
+                pass
+        except OSError as e:
+            errors.append(f"{path}: {e.strerror or e}")
+            continue
+        if path.endswith(secrets.SECRET_FILE_EXTENSIONS):
+            try:
+                for file, line_no, content in secrets.scan_file_for_secrets(path):
+                    findings.append({"check": "secrets", "file": file, "line": line_no, "finding": content})
+            except OSError as e:
+                errors.append(f"{path}: {e.strerror or e}")
+        if not debug_mode.is_skipped_dir(os.path.dirname(path)):
+            for finding in debug_mode.scan_file_for_debug_settings(path):
+                findings.append({"check": "debug", **finding})
+    return findings, errors
+
+def run_distributed_scan(args):
+    """
+    Runs the secrets and debug mode scans through a coordinator, optionally starting local worker processes.
+    Returns (secret findings, debug findings, errors): the findings in the same shapes as the serial scans,
+    ordered by file and line, and the files workers could not read.
+    """
+    paths = collect_scan_files(args.path)
+    units = distributed.make_work_units(paths, args.work_units or max(16, 4 * args.local_workers))
+    address = args.coordinator
+    token = args.token
+    if not token and not distributed.is_loopback(address[0]):
+        token = distributed.make_token() # Never serve other machines without a token
+        print(f"🔑 Generated worker token (pass it with --token or ${distributed.TOKEN_ENV_VAR}): {token}")
+    coordinator = distributed.ScanCoordinator(units, address, token=token).start()
+    host, port = coordinator.address
+    print(f"🛰️ Coordinator listening on {host}:{port}: {len(paths)} files in {len(units)} work units.")
+    if not args.local_workers:
+        print(f"   Start workers with: python scanner.py --worker {host}:{port}")
+    print()
+
+    workers = [multiprocessing.Process(target=distributed.run_worker, args=((host, port), scan_files),
+                                       kwargs={"token": token}, daemon=True)
+               for _ in range(args.local_workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        # With only remote workers, more may still connect; with local ones, give up once they have all exited.
+        workers_alive = (lambda: any(worker.is_alive() for worker in workers)) if workers else None
+        findings, errors = coordinator.wait(workers_alive=workers_alive)
+    finally:
+        for worker in workers:
+            worker.join(timeout=5)
+        coordinator.close()
+
+    secret_findings = [(f["file"], f["line"], f["finding"]) for f in findings if f["check"] == "secrets"]
+    debug_findings = [{k: v for k, v in f.items() if k != "check"} for f in findings if f["check"] == "debug"]
+    return secret_findings, debug_findings, errors
 
 def main():
     parser = argparse.ArgumentParser(description="AppSec Toolkit: Scan a project for security issues.")
     parser.add_argument("--path", help="Path to the source code directory to scan")
     parser.add_argument("--url", help="URL to check for security headers")
+    parser.add_argument("--crawl", action="store_true", help="With --url, crawl same-origin links and report each distinct header configuration")
+    parser.add_argument("--max-depth", type=int, default=2, help="Maximum link depth to follow in --crawl mode (default: 2)")
+    parser.add_argument("--max-pages", type=int, default=50, help="Maximum number of pages to fetch in --crawl mode (default: 50)")
+    parser.add_argument("--ignore-robots", action="store_true", help="Don't honour robots.txt in --crawl mode")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch --url afresh instead of reusing or revalidating cached response headers")
+    parser.add_argument("--cache-ttl", type=int, default=headers.DEFAULT_CACHE_TTL,
+                        help=f"Seconds a cached --url result is reused before being revalidated (default: {headers.DEFAULT_CACHE_TTL})")
+    parser.add_argument("--coordinator", metavar="HOST:PORT", type=distributed.parse_address,
+                        help="With --path, distribute the secrets and debug mode scans to workers connecting to HOST:PORT (port 0 picks a free port)")
+    parser.add_argument("--local-workers", type=int, default=0, help="Number of worker processes to start on this machine in --coordinator mode")
+    parser.add_argument("--work-units", type=int, default=0, help="Number of size-balanced work units in --coordinator mode (default: 4 per local worker, at least 16)")
+    parser.add_argument("--worker", metavar="HOST:PORT", type=distributed.parse_address, help="Run as a worker for the coordinator at HOST:PORT")
+    parser.add_argument("--token", default=os.environ.get(distributed.TOKEN_ENV_VAR),
+                        help=f"Shared token workers must present to the coordinator (default: ${distributed.TOKEN_ENV_VAR}; "
+                             "generated automatically when the coordinator listens on a non-loopback address)")
     # Future: Add --skip-audit or --skip-secrets etc.
 
     args = parser.parse_args()
 
+    if args.worker:
+        try:
+            units_scanned = distributed.run_worker(args.worker, scan_files, token=args.token)
+        except (OSError, RuntimeError) as e:
+            print(f"🚨 Worker stopped: {e}")
+            return
+        print(f"✅ Worker finished after scanning {units_scanned} work units.")
+        return
+
     if not args.path and not args.url:
         parser.print_help()
         print("\nError: You must specify either --path or --url.")
         return
 
     if args.path:
+        try:
+            distributed_findings = run_distributed_scan(args) if args.coordinator else None
+        except RuntimeError as e:
+            print(f"🚨 Distributed scan failed: {e}")
+            return
+        if distributed_findings and distributed_findings[2]:
+            print(f"🚨 Workers could not read {len(distributed_findings[2])} files, so the results below are incomplete:")
+            for error in distributed_findings[2]:
+                print(f"  📄 {error}")
+            print("-" * 40)
+
         # Secrets Scan
         print(f"🔍 Scanning {args.path} for secrets...\n")
-        secret_findings = secrets.scan_for_secrets(args.path)
+        if distributed_findings is not None:
+            secret_findings = distributed_findings[0]
+        else:
+            secret_findings = secrets.scan_for_secrets(args.path)
         if secret_findings:
             print("🚨 Potential secrets found:")
             for file, line_no, content in secret_findings:
@@ -29,7 +146,10 @@ def main():
 
         # Debug Mode Scan
         print(f"🔍 Scanning {args.path} for debug mode settings...\n")
-        debug_findings = debug_mode.scan_for_debug_settings(args.path)
+        if distributed_findings is not None:
+            debug_findings = distributed_findings[1]
+        else:
+            debug_findings = debug_mode.scan_for_debug_settings(args.path)
         if debug_findings:
             print("🚨 Potential debug/development settings found:")
             for finding in debug_findings:
@@ -41,15 +161,16 @@ def main():
         print("-" * 40)
 
         # Dependency Vulnerability Scan
-        print(f"🔍 Checking for vulnerable dependencies in {args.path} (requires requirements.txt and pip-audit)...\n")
+        print(f"🔍 Checking for vulnerable dependencies in {args.path} (requires a requirements file, lockfile or pyproject.toml, and pip-audit)...\n")
         dep_results = dependencies.check_dependencies(args.path)
         
         if dep_results.get("error"):
             print(f"🚨 Error during dependency check: {dep_results['error']}")
-        elif not dep_results.get("vulnerabilities"): # Check if the key exists and is empty
-            # This handles both "success" message from check_dependencies and empty "vulnerabilities" list
-            success_msg = dep_results.get("success", "✅ No vulnerable dependencies found.")
-            print(success_msg)
+        if not dep_results.get("vulnerabilities"): # Check if the key exists and is empty
+            if not dep_results.get("error"):
+                # This handles both "success" message from check_dependencies and empty "vulnerabilities" list
+                success_msg = dep_results.get("success", "✅ No vulnerable dependencies found.")
+                print(success_msg)
         else: # Vulnerabilities found
             print("🚨 Vulnerable dependencies found:")
             for vuln in dep_results["vulnerabilities"]:
@@ -60,16 +181,44 @@ def main():
                 if fix_versions:
                     print(f"     Fix Versions: {', '.join(fix_versions)}")
                 print("     " + "-" * 5) # Indented separator
+        if dep_results.get("unpinned"):
+            print(f"ℹ️ Not pinned by any manifest: {', '.join(dep_results['unpinned'])}")
+        for manifest_error in dep_results.get("manifest_errors", []):
+            print(f"⚠️ Could not parse {manifest_error}")
         print("-" * 40)
 
 
-    if args.url:
+    if args.url and args.crawl:
+        # Header Check across crawled routes
+        print(f"🔍 Crawling {args.url} and checking security headers (depth {args.max_depth}, up to {args.max_pages} pages)...\n")
+        crawl_results = headers.crawl_security_headers(args.url, max_depth=args.max_depth, max_pages=args.max_pages,
+                                                       respect_robots=not args.ignore_robots)
+        print(f"ℹ️ {crawl_results['pages_crawled']} pages crawled, {len(crawl_results['profiles'])} distinct header configurations.")
+        for i, profile in enumerate(crawl_results["profiles"], 1):
+            print(f"\n📑 Configuration {i}: {', '.join(profile['route_patterns'])}")
+            if profile["found_headers"]:
+                print("  ✅ Found Headers:")
+                for header, value in profile["found_headers"].items():
+                    print(f"    {header}: {value}")
+            if profile["missing_headers"]:
+                print("  ⚠️ Missing Headers:")
+                for header in profile["missing_headers"]:
+                    print(f"    - {header}")
+        for error in crawl_results["errors"]:
+            print(f"🚨 Error: {error}")
+        if crawl_results["skipped_by_robots"]:
+            print(f"\nℹ️ {len(crawl_results['skipped_by_robots'])} links skipped because of robots.txt.")
+        print("-" * 40)
+    elif args.url:
         # Header Check
         print(f"🔍 Checking security headers for {args.url}...\n")
-        header_results = headers.check_security_headers(args.url)
+        cache_dir = None if args.no_cache else headers.DEFAULT_CACHE_DIR
+        header_results = headers.check_security_headers(args.url, cache_dir=cache_dir, cache_ttl=args.cache_ttl)
         if header_results.get("error"):
             print(f"🚨 Error: {header_results['error']}")
         else:
+            if header_results.get("cached"):
+                print("ℹ️ Unchanged since the last check (cached response headers, use --no-cache to refetch).")
             if header_results["found_headers"]:
                 print("✅ Found Headers:")
                 for header, value in header_results["found_headers"].items():
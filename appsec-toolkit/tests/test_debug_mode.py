@@ -1,6 +1,7 @@
 import unittest
 import os
 import shutil
+from unittest.mock import patch
 from appsec_toolkit.checks import debug_mode # Use the correct module name
 
 class TestDebugModeDetection(unittest.TestCase):
@@ -87,5 +88,88 @@ class TestDebugModeDetection(unittest.TestCase):
         self.assertEqual(len(findings), 1, f"Findings: {findings}")
         self.assertEqual(findings[0]["finding"], "DeBuG = TrUe")
 
+    def test_flask_run_and_config_debug(self):
+        self._create_file(["app.py"],
+                          "from flask import Flask\n"
+                          "app = Flask(__name__)\n"
+                          "app.config[\"DEBUG\"] = True\n"
+                          "app.run(host='0.0.0.0', debug=True)\n")
+        findings = debug_mode.scan_for_debug_settings(self.test_project_dir)
+        self.assertEqual([f["line"] for f in findings], [3, 4], f"Findings: {findings}")
+
+    def test_django_setting_split_over_lines(self):
+        self._create_file(["settings.py"], "DEBUG = (\n    True\n)\n")
+        findings = debug_mode.scan_for_debug_settings(self.test_project_dir)
+        self.assertEqual(len(findings), 1, f"Findings: {findings}")
+        self.assertEqual(findings[0]["line"], 1)
+
+    def test_ignores_strings_and_comments(self):
+        self._create_file(["docs.py"],
+                          "# DEBUG = True\n"
+                          "HELP = \"\"\"\n"
+                          "DEBUG = True\n"
+                          "\"\"\"\n"
+                          "app.run(debug=False)\n")
+        findings = debug_mode.scan_for_debug_settings(self.test_project_dir)
+        self.assertEqual(len(findings), 0, f"Findings: {findings}")
+
+    def test_unparseable_file_falls_back_to_patterns(self):
+        self._create_file(["legacy.py"], "print 'hello'\nDEBUG = True\n")
+        findings = debug_mode.scan_for_debug_settings(self.test_project_dir)
+        self.assertEqual(len(findings), 1, f"Findings: {findings}")
+        self.assertEqual(findings[0]["line"], 2)
+
+    def test_keyword_on_unindented_continuation_line(self):
+        self._create_file(["run.py"], "import app\napp.run(host='0.0.0.0',\ndebug=True)\n")
+        findings = debug_mode.scan_for_debug_settings(self.test_project_dir)
+        self.assertEqual(len(findings), 1, f"Findings: {findings}")
+        self.assertEqual(findings[0]["finding"], "app.run(host='0.0.0.0', debug=True)")
+
+    def test_quotes_inside_strings_and_comments_before_setting(self):
+        self._create_file(["settings.py"],
+                          "QUOTE = '\"\"\"'  # a lone \"\"\" here too\n"
+                          "DEBUG = True\n"
+                          "HELP = '''\n"
+                          "DEBUG = True\n"
+                          "'''\n")
+        findings = debug_mode.scan_for_debug_settings(self.test_project_dir)
+        self.assertEqual([f["line"] for f in findings], [2], f"Findings: {findings}")
+
+    def test_backslash_continued_setting(self):
+        self._create_file(["settings.py"], "DEBUG \\\n    = True\nAPP_DEBUG = False\n")
+        self._create_file(["run.py"], "app.run(debug \\\n= True)\n")
+        findings = debug_mode.scan_for_debug_settings(self.test_project_dir)
+        self.assertEqual(sorted((os.path.basename(f["file"]), f["line"]) for f in findings),
+                         [("run.py", 1), ("settings.py", 1)], f"Findings: {findings}")
+
+    def test_only_statements_around_candidates_are_parsed(self):
+        body = "".join(f"def handler_{i}(request):\n    return render(request, 'page_{i}.html')  # debug view\n"
+                       for i in range(150))
+        for i in range(30):
+            self._create_file(["bench", f"module_{i}.py"], f"# module {i}\n" + ("DEBUG = True\n" if i % 10 == 0 else "") + body)
+        debug_mode._PARSE_CACHE.clear()
+
+        parsed_lines = []
+        def counting_parse(source, *args, **kwargs):
+            parsed_lines.append(source.count(b"\n") + 1)
+            return ast_parse(source, *args, **kwargs)
+        ast_parse = debug_mode.ast.parse
+        with patch.object(debug_mode.ast, "parse", side_effect=counting_parse):
+            findings = debug_mode.scan_for_debug_settings(self.test_project_dir)
+
+        # Three one-line DEBUG statements are parsed; the 300 lines around each, and the
+        # files whose only "debug" is in a comment, are never handed to ast.parse.
+        self.assertEqual(len(findings), 3)
+        self.assertEqual(parsed_lines, [1, 1, 1])
+
+    def test_identical_files_are_parsed_once(self):
+        self._create_file(["a", "settings.py"], "DEBUG = True\n")
+        self._create_file(["b", "settings.py"], "DEBUG = True\n")
+        debug_mode._PARSE_CACHE.clear()
+        with patch.object(debug_mode.ast, "parse", wraps=debug_mode.ast.parse) as mock_parse:
+            findings = debug_mode.scan_for_debug_settings(self.test_project_dir)
+        self.assertEqual(len(findings), 2)
+        self.assertEqual(mock_parse.call_count, 1)
+
 if __name__ == '__main__':
     unittest.main()
@@ -112,5 +112,171 @@ class TestDependencyChecker(unittest.TestCase):
         self.assertIn("error", results)
         self.assertTrue("pip-audit failed to create virtual environment" in results["error"])
 
+    def _create_file(self, path_segments, content):
+        filepath = os.path.join(self.test_project_dir, *path_segments)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "w", encoding="utf-8") as f:
+            f.write(content)
+        return filepath
+
+    def test_parse_requirements_with_includes_and_hashes(self):
+        self._create_file(["requirements-base.txt"], "Django==4.2.1 ; python_version >= '3.8'\n")
+        self._create_file(["requirements.txt"],
+                          "# app deps\n"
+                          "-r requirements-base.txt\n"
+                          "--index-url https://pypi.org/simple\n"
+                          "requests[socks]==2.31.0 \\\n"
+                          "    --hash=sha256:aaaa \\\n"
+                          "    --hash=sha256:bbbb\n"
+                          "flask>=2.0\n"
+                          "-e .\n"
+                          "./vendor/internal-lib\n")
+        pinned, unpinned = dependencies.parse_requirements_file(self.requirements_path)
+        self.assertEqual(pinned, {"django": "4.2.1", "requests": "2.31.0"})
+        self.assertEqual(unpinned, ["flask>=2.0"])
+
+    def test_parse_poetry_lock(self):
+        path = self._create_file(["poetry.lock"],
+                                 '[[package]]\nname = "Jinja2"\nversion = "3.1.2"\n\n'
+                                 '[[package]]\nname = "markupsafe"\nversion = "2.1.3"\n')
+        pinned, unpinned = dependencies.parse_poetry_lock(path)
+        self.assertEqual(pinned, {"jinja2": "3.1.2", "markupsafe": "2.1.3"})
+        self.assertEqual(unpinned, [])
+
+    def test_parse_pipfile_lock(self):
+        path = self._create_file(["Pipfile.lock"], json.dumps({
+            "default": {"requests": {"version": "==2.31.0"}},
+            "develop": {"pytest": {"version": "==7.4.0"}, "mylib": {"git": "https://example.com/mylib.git"}},
+        }))
+        pinned, unpinned = dependencies.parse_pipfile_lock(path)
+        self.assertEqual(pinned, {"requests": "2.31.0", "pytest": "7.4.0"})
+        self.assertEqual(unpinned, ["mylib @ git+https://example.com/mylib.git"])
+
+    def test_parse_pyproject(self):
+        path = self._create_file(["pyproject.toml"],
+                                 '[project]\ndependencies = ["attrs==23.1.0", "click>=8"]\n\n'
+                                 '[tool.poetry.dependencies]\npython = "^3.10"\n'
+                                 'PyYAML = "6.0.1"\nrich = {version = "^13.0"}\n')
+        pinned, unpinned = dependencies.parse_pyproject(path)
+        self.assertEqual(pinned, {"attrs": "23.1.0", "pyyaml": "6.0.1"})
+        self.assertEqual(sorted(unpinned), ["click>=8", "rich"])
+
+    def test_parse_poetry_lock_non_pypi_sources(self):
+        path = self._create_file(["poetry.lock"],
+                                 '[[package]]\nname = "requests"\nversion = "2.31.0"\n\n'
+                                 '[[package]]\nname = "internal-lib"\nversion = "0.1.0"\n'
+                                 '[package.source]\ntype = "directory"\nurl = "../internal-lib"\n\n'
+                                 '[[package]]\nname = "flask"\nversion = "2.3.2"\n'
+                                 '[package.source]\ntype = "git"\nurl = "https://example.com/flask-fork.git"\n'
+                                 'reference = "main"\nresolved_reference = "abc123"\n\n'
+                                 '[[package]]\nname = "django"\nversion = "4.2.1"\n'
+                                 '[package.source]\ntype = "url"\nurl = "https://example.com/django-4.2.1.tar.gz"\n')
+        pinned, unpinned = dependencies.parse_poetry_lock(path)
+        self.assertEqual(pinned, {"requests": "2.31.0"})
+        self.assertEqual(unpinned, ["flask @ git+https://example.com/flask-fork.git@abc123",
+                                    "django @ https://example.com/django-4.2.1.tar.gz"])
+
+    def test_parse_pyproject_poetry_git_and_url_dependencies(self):
+        path = self._create_file(["pyproject.toml"],
+                                 '[tool.poetry.dependencies]\n'
+                                 'flask = {git = "https://example.com/flask-fork.git", tag = "v2.3.2"}\n'
+                                 'django = {url = "https://example.com/django-4.2.1.tar.gz"}\n'
+                                 'internal-lib = {path = "../internal-lib", develop = true}\n')
+        pinned, unpinned = dependencies.parse_pyproject(path)
+        self.assertEqual(pinned, {})
+        self.assertEqual(unpinned, ["flask @ git+https://example.com/flask-fork.git@v2.3.2",
+                                    "django @ https://example.com/django-4.2.1.tar.gz"])
+
+    def test_vcs_requirements_are_resolved_not_dropped(self):
+        self._create_requirements_file("-e git+https://example.com/y.git@v1#egg=y\n"
+                                       "git+https://example.com/z.git\n")
+        manifest = dependencies.collect_pinned_dependencies(self.test_project_dir)
+        self.assertEqual(manifest["unpinned_requirements"],
+                         ["git+https://example.com/z.git", "y @ git+https://example.com/y.git@v1"])
+
+    def test_malformed_manifests_are_reported(self):
+        self._create_requirements_file("requests==2.19.0\n")
+        self._create_file(["Pipfile.lock"], '["not", "a", "lockfile"]')
+        self._create_file(["poetry.lock"], 'package = ["django"]\n')
+        self._create_file(["pyproject.toml"], '[tool.poetry.dependencies]\nflask = 2\n')
+        manifest = dependencies.collect_pinned_dependencies(self.test_project_dir)
+        self.assertEqual(manifest["pinned"], {"requests": "2.19.0"})
+        self.assertEqual(len(manifest["errors"]), 3, manifest["errors"])
+
+    def test_site_packages_resolves_unpinned_requirements(self):
+        self._create_requirements_file("flask\n")
+        self._create_file([".venv", "lib", "python3.11", "site-packages", "Flask-2.3.2.dist-info", "METADATA"],
+                          "Metadata-Version: 2.1\nName: Flask\nVersion: 2.3.2\n\nName: not-a-header\n")
+        manifest = dependencies.collect_pinned_dependencies(self.test_project_dir)
+        self.assertEqual(manifest["pinned"], {"flask": "2.3.2"})
+        self.assertEqual(manifest["unpinned"], [])
+
+    def test_site_packages_skips_editable_and_local_installs(self):
+        site_packages = [".venv", "lib", "python3.11", "site-packages"]
+        self._create_file(site_packages + ["requests-2.31.0.dist-info", "METADATA"], "Name: requests\nVersion: 2.31.0\n")
+        self._create_file(site_packages + ["myproject-0.1.dist-info", "METADATA"], "Name: myproject\nVersion: 0.1\n")
+        self._create_file(site_packages + ["myproject-0.1.dist-info", "direct_url.json"],
+                          '{"url": "file:///src/myproject", "dir_info": {"editable": true}}')
+        manifest = dependencies.collect_pinned_dependencies(self.test_project_dir)
+        self.assertEqual(manifest["pinned"], {"requests": "2.31.0"})
+
+    def _audit_calls(self, mock_subprocess_run):
+        # Records each pip-audit command with the contents of the requirements file it was given.
+        calls = []
+        def run(command, **kwargs):
+            with open(command[command.index("-r") + 1]) as f:
+                calls.append((command, f.read().split()))
+            mock_response = MagicMock()
+            mock_response.stdout = json.dumps([])
+            mock_response.stderr = ""
+            mock_response.returncode = 0
+            return mock_response
+        mock_subprocess_run.side_effect = run
+        return calls
+
+    @patch('appsec_toolkit.checks.dependencies.subprocess.run')
+    def test_pinned_project_skips_dependency_resolution(self, mock_subprocess_run):
+        self._create_file(["poetry.lock"], '[[package]]\nname = "requests"\nversion = "2.19.0"\n')
+        mock_response = MagicMock()
+        mock_response.stdout = json.dumps([])
+        mock_response.stderr = ""
+        mock_response.returncode = 0
+        mock_subprocess_run.return_value = mock_response
+
+        results = dependencies.check_dependencies(self.test_project_dir)
+        self.assertNotIn("error", results, f"Results were: {results}")
+        command = mock_subprocess_run.call_args[0][0]
+        self.assertIn("--no-deps", command)
+        self.assertIn("--disable-pip", command)
+
+    @patch('appsec_toolkit.checks.dependencies.subprocess.run')
+    def test_unpinned_requirements_fall_back_to_pip_audit_resolution(self, mock_subprocess_run):
+        self._create_requirements_file("requests>=2.0\nflask==2.3.2\n")
+        calls = self._audit_calls(mock_subprocess_run)
+
+        results = dependencies.check_dependencies(self.test_project_dir)
+        self.assertEqual(len(calls), 2)
+        (pinned_command, pins), (resolve_command, leftovers) = calls
+        self.assertEqual(pins, ["flask==2.3.2"])
+        self.assertIn("--disable-pip", pinned_command)
+        self.assertEqual(leftovers, ["requests>=2.0"])
+        self.assertNotIn("--disable-pip", resolve_command)
+        self.assertEqual(results["unpinned"], ["requests"])
+
+    @patch('appsec_toolkit.checks.dependencies.subprocess.run')
+    def test_editable_install_does_not_discard_pins(self, mock_subprocess_run):
+        self._create_requirements_file("-e .\nrequests==2.19.0\n")
+        self._create_file(["poetry.lock"], '[[package]]\nname = "django"\nversion = "1.0"\n')
+        calls = self._audit_calls(mock_subprocess_run)
+
+        results = dependencies.check_dependencies(self.test_project_dir)
+        self.assertEqual(len(calls), 1, f"Calls were: {calls}")
+        command, pins = calls[0]
+        self.assertEqual(pins, ["django==1.0", "requests==2.19.0"])
+        self.assertIn("--no-deps", command)
+        self.assertIn("--disable-pip", command)
+        self.assertNotIn("--strict", command)
+        self.assertNotIn("unpinned", results)
+
 if __name__ == '__main__':
     unittest.main()
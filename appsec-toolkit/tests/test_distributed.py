@@ -0,0 +1,194 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import socket
+import sys
+import threading
+import unittest
+from appsec_toolkit.utils import distributed
+
+# scanner.py is a script that imports its siblings (checks, utils) as top-level packages.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import scanner
+
+def _scan_files(paths):
+    # Stand-in for scanner.scan_files: one finding per file, echoing its size.
+    return [{"file": path, "line": 1, "finding": str(os.path.getsize(path))} for path in paths], []
+
+class TestDistributedScan(unittest.TestCase):
+
+    def setUp(self):
+        self.test_project_dir = "temp_distributed_test_project"
+        os.makedirs(self.test_project_dir, exist_ok=True)
+        self.paths = []
+        for i in range(20):
+            filepath = os.path.join(self.test_project_dir, f"file_{i:02}.py")
+            with open(filepath, "w") as f:
+                f.write("x" * (i * 100 + 1))
+            self.paths.append(filepath)
+        self.expected = sorted(_scan_files(self.paths)[0], key=lambda finding: finding["file"])
+
+    def tearDown(self):
+        if os.path.exists(self.test_project_dir):
+            shutil.rmtree(self.test_project_dir)
+
+    def _start_workers(self, coordinator, count):
+        threads = [threading.Thread(target=distributed.run_worker, args=(coordinator.address, _scan_files), daemon=True)
+                   for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _take_unit_and_stall(self, coordinator):
+        # A misbehaving worker: takes one unit and never reports back.
+        sock = socket.create_connection(coordinator.address)
+        sock.sendall(json.dumps({"type": "ready"}).encode("utf-8") + b"\n")
+        reply = json.loads(sock.makefile("rb").readline())
+        self.assertEqual(reply["type"], "unit")
+        return sock
+
+    def test_work_units_are_size_balanced(self):
+        units = distributed.make_work_units(self.paths, 4)
+        self.assertEqual(len(units), 4)
+        self.assertEqual(sorted(path for unit in units for path in unit["files"]), sorted(self.paths))
+        sizes = [unit["bytes"] for unit in units]
+        self.assertLessEqual(max(sizes) - min(sizes), 1900)  # At most the largest single file apart
+
+    def test_several_workers_merge_ordered_results(self):
+        coordinator = distributed.ScanCoordinator(distributed.make_work_units(self.paths, 8)).start()
+        try:
+            threads = self._start_workers(coordinator, 3)
+            findings, errors = coordinator.wait(timeout=10)
+            for thread in threads:
+                thread.join(timeout=5)
+        finally:
+            coordinator.close()
+        self.assertEqual(findings, self.expected)
+        self.assertEqual(errors, [])
+
+    def test_units_of_dead_worker_are_requeued(self):
+        coordinator = distributed.ScanCoordinator(distributed.make_work_units(self.paths, 4)).start()
+        try:
+            self._take_unit_and_stall(coordinator).close()  # Dies holding a unit
+            self._start_workers(coordinator, 2)
+            findings, errors = coordinator.wait(timeout=10)
+        finally:
+            coordinator.close()
+        self.assertEqual(findings, self.expected)
+        self.assertEqual(errors, [])
+
+    def test_idle_worker_steals_unit_from_stalled_worker(self):
+        coordinator = distributed.ScanCoordinator(distributed.make_work_units(self.paths, 4)).start()
+        stalled = self._take_unit_and_stall(coordinator)  # Stays connected but never finishes
+        try:
+            self._start_workers(coordinator, 1)
+            findings, errors = coordinator.wait(timeout=10)
+        finally:
+            stalled.close()
+            coordinator.close()
+        self.assertEqual(findings, self.expected)
+        self.assertEqual(errors, [])
+
+    def test_worker_with_wrong_token_is_refused(self):
+        coordinator = distributed.ScanCoordinator(distributed.make_work_units(self.paths, 4), token="s3cret").start()
+        try:
+            with self.assertRaises(RuntimeError):
+                distributed.run_worker(coordinator.address, _scan_files, token="guess")
+            with self.assertRaises(RuntimeError):
+                distributed.run_worker(coordinator.address, _scan_files)
+            distributed.run_worker(coordinator.address, _scan_files, token="s3cret")
+            findings, errors = coordinator.wait(timeout=10)
+        finally:
+            coordinator.close()
+        self.assertEqual(findings, self.expected)
+        self.assertEqual(errors, [])
+
+    def test_wait_fails_when_no_workers_are_left(self):
+        coordinator = distributed.ScanCoordinator(distributed.make_work_units(self.paths, 4)).start()
+        try:
+            self._take_unit_and_stall(coordinator).close()  # The only worker dies holding a unit
+            with self.assertRaises(RuntimeError):
+                coordinator.wait(timeout=10, workers_alive=lambda: False)
+        finally:
+            coordinator.close()
+
+    def test_unreadable_files_are_reported_as_unit_errors(self):
+        def scan_with_missing_file(paths):
+            findings, errors = _scan_files(paths[1:])
+            return findings, errors + [f"{paths[0]}: No such file or directory"]
+
+        units = distributed.make_work_units(self.paths, 2)
+        coordinator = distributed.ScanCoordinator(units).start()
+        try:
+            distributed.run_worker(coordinator.address, scan_with_missing_file)
+            findings, errors = coordinator.wait(timeout=10)
+        finally:
+            coordinator.close()
+        self.assertEqual(errors, [f"{unit['files'][0]}: No such file or directory" for unit in units])
+        self.assertEqual(len(findings), len(self.paths) - 2)
+
+    def test_malformed_messages_are_treated_as_dropped_connections(self):
+        coordinator = distributed.ScanCoordinator(distributed.make_work_units(self.paths, 4)).start()
+        try:
+            for bad_result in ([1, 2], {"type": "result", "unit_id": 0, "findings": "oops"},
+                               {"type": "result", "unit_id": 0, "findings": [1]}):
+                sock = self._take_unit_and_stall(coordinator)
+                sock.sendall(json.dumps(bad_result).encode("utf-8") + b"\n")
+                self.assertEqual(sock.makefile("rb").readline(), b"")  # Coordinator hung up
+                sock.close()
+            self._start_workers(coordinator, 1)
+            findings, errors = coordinator.wait(timeout=10)
+        finally:
+            coordinator.close()
+        self.assertEqual(findings, self.expected)
+
+    def test_parse_address(self):
+        self.assertEqual(distributed.parse_address("127.0.0.1:9000"), ("127.0.0.1", 9000))
+        with self.assertRaises(ValueError):
+            distributed.parse_address("localhost")
+
+class TestDistributedScanner(unittest.TestCase):
+
+    def setUp(self):
+        self.test_project_dir = "temp_distributed_scanner_project"
+        for i in range(12):
+            os.makedirs(os.path.join(self.test_project_dir, f"pkg_{i % 3}"), exist_ok=True)
+            with open(os.path.join(self.test_project_dir, f"pkg_{i % 3}", f"settings_{i}.py"), "w") as f:
+                f.write("import os\n" * i + f"DEBUG = {i % 2 == 0}\nAPI_KEY = 'abcdefgh{i}'\n")
+        with open(os.path.join(self.test_project_dir, ".env"), "w") as f:
+            f.write("DEBUG=true\ntoken=0123456789\n")
+
+    def tearDown(self):
+        if os.path.exists(self.test_project_dir):
+            shutil.rmtree(self.test_project_dir)
+
+    def test_local_workers_match_serial_scans(self):
+        # A relative --path: work units must still carry absolute paths.
+        args = argparse.Namespace(path=self.test_project_dir, coordinator=("127.0.0.1", 0), local_workers=2,
+                                  work_units=0, token=None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            secret_findings, debug_findings, errors = scanner.run_distributed_scan(args)
+
+        absolute_dir = os.path.abspath(self.test_project_dir)
+        expected_secrets = sorted(scanner.secrets.scan_for_secrets(absolute_dir))
+        expected_debug = sorted(scanner.debug_mode.scan_for_debug_settings(absolute_dir),
+                                key=lambda finding: (finding["file"], finding["line"]))
+        self.assertEqual(len(expected_secrets), 13)
+        self.assertEqual(len(expected_debug), 7)
+        self.assertEqual(sorted(secret_findings), expected_secrets)
+        self.assertEqual(debug_findings, expected_debug)
+        self.assertEqual(errors, [])
+
+    def test_scan_files_reports_missing_files(self):
+        present = os.path.abspath(os.path.join(self.test_project_dir, ".env"))
+        missing = os.path.abspath(os.path.join(self.test_project_dir, "gone.py"))
+        findings, errors = scanner.scan_files([missing, present])
+        self.assertEqual(len(findings), 2)
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith(missing), errors)
+
+if __name__ == '__main__':
+    unittest.main()
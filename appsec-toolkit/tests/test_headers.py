@@ -1,4 +1,8 @@
+import shutil
+import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch, MagicMock
 from appsec_toolkit.checks import headers # Assuming scanner.py and checks/ are in appsec_toolkit path
 
@@ -103,6 +107,259 @@ class TestHeaderChecker(unittest.TestCase):
         self.assertNotIn("error", results)
         # print("test_header_case_insensitivity results:", results) # For debugging
 
+class TestHeaderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix="appsec_header_cache_")
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _mock_response(self, headers_dict, status_code=200, url="http://example-cache.com/"):
+        mock_response = MagicMock()
+        mock_response.headers = headers_dict
+        mock_response.status_code = status_code
+        mock_response.url = url
+        mock_response.history = []
+        return mock_response
+
+    @patch('appsec_toolkit.checks.headers.requests.get')
+    def test_fresh_entry_is_reused_without_request(self, mock_get):
+        mock_get.return_value = self._mock_response({"X-Frame-Options": "DENY"})
+
+        first = headers.check_security_headers("http://example-cache.com/", cache_dir=self.cache_dir)
+        second = headers.check_security_headers("http://example-cache.com/", cache_dir=self.cache_dir)
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertNotIn("cached", first)
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["found_headers"], {"X-Frame-Options": "DENY"})
+
+    @patch('appsec_toolkit.checks.headers.requests.get')
+    def test_stale_entry_is_revalidated_with_etag(self, mock_get):
+        mock_get.return_value = self._mock_response({"ETag": '"v1"', "X-Frame-Options": "DENY"})
+        headers.check_security_headers("http://example-cache.com/", cache_dir=self.cache_dir)
+
+        mock_get.return_value = self._mock_response({"ETag": '"v1"'}, status_code=304)
+        results = headers.check_security_headers("http://example-cache.com/", cache_dir=self.cache_dir, cache_ttl=0)
+
+        request_headers = mock_get.call_args[1]["headers"]
+        self.assertEqual(request_headers["If-None-Match"], '"v1"')
+        self.assertTrue(results["cached"])
+        self.assertEqual(results["found_headers"], {"X-Frame-Options": "DENY"})
+
+    @patch('appsec_toolkit.checks.headers.requests.head')
+    @patch('appsec_toolkit.checks.headers.requests.get')
+    def test_stale_entry_without_validators_uses_head(self, mock_get, mock_head):
+        mock_get.return_value = self._mock_response({"X-Frame-Options": "DENY"})
+        headers.check_security_headers("http://example-cache.com/", cache_dir=self.cache_dir)
+
+        mock_head.return_value = self._mock_response({"X-Frame-Options": "SAMEORIGIN"})
+        results = headers.check_security_headers("http://example-cache.com/", cache_dir=self.cache_dir, cache_ttl=0)
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_head.call_count, 1)
+        self.assertFalse(results["cached"])
+        self.assertEqual(results["found_headers"], {"X-Frame-Options": "SAMEORIGIN"})
+
+    @patch('appsec_toolkit.checks.headers.requests.get')
+    def test_redirected_url_is_cached_under_final_url(self, mock_get):
+        redirect = MagicMock()
+        redirect.url = "http://example-cache.com/"
+        final = self._mock_response({"X-Frame-Options": "DENY"}, url="https://example-cache.com/home")
+        final.history = [redirect]
+        mock_get.return_value = final
+
+        headers.check_security_headers("http://example-cache.com/", cache_dir=self.cache_dir)
+        entry = headers._load_cache_entry(self.cache_dir, "https://example-cache.com/home")
+        self.assertEqual(entry["redirect_chain"], ["http://example-cache.com/", "https://example-cache.com/home"])
+
+        results = headers.check_security_headers("http://example-cache.com/", cache_dir=self.cache_dir)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertTrue(results["cached"])
+
+    def _cache_redirect(self, mock_get):
+        redirect = MagicMock()
+        redirect.url = "http://example-cache.com/"
+        final = self._mock_response({"X-Frame-Options": "DENY"}, url="https://example-cache.com/home")
+        final.history = [redirect]
+        mock_get.return_value = final
+        headers.check_security_headers("http://example-cache.com/", cache_dir=self.cache_dir)
+
+    @patch('appsec_toolkit.checks.headers.requests.head')
+    @patch('appsec_toolkit.checks.headers.requests.get')
+    def test_stale_redirect_is_rechecked_before_final_url(self, mock_get, mock_head):
+        self._cache_redirect(mock_get)
+        mock_head.side_effect = [
+            self._mock_response({"location": "https://example-cache.com/home"}, status_code=301),
+            self._mock_response({"X-Frame-Options": "DENY"}, url="https://example-cache.com/home"),
+        ]
+
+        results = headers.check_security_headers("http://example-cache.com/", cache_dir=self.cache_dir, cache_ttl=0)
+        self.assertEqual([c[0][0] for c in mock_head.call_args_list],
+                         ["http://example-cache.com/", "https://example-cache.com/home"])
+        self.assertFalse(mock_head.call_args_list[0][1]["allow_redirects"])
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertFalse(results["cached"])
+
+    @patch('appsec_toolkit.checks.headers.requests.head')
+    @patch('appsec_toolkit.checks.headers.requests.get')
+    def test_dropped_redirect_forces_full_request(self, mock_get, mock_head):
+        self._cache_redirect(mock_get)
+        # The http -> https redirect is gone; the http URL now answers directly without the header.
+        mock_head.return_value = self._mock_response({})
+        mock_get.return_value = self._mock_response({})
+
+        results = headers.check_security_headers("http://example-cache.com/", cache_dir=self.cache_dir, cache_ttl=0)
+        self.assertEqual(mock_head.call_count, 1)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertNotIn("cached", results)
+        self.assertIn("X-Frame-Options", results["missing_headers"])
+
+    @patch('appsec_toolkit.checks.headers.requests.get')
+    def test_malformed_cache_entry_is_a_miss(self, mock_get):
+        mock_get.return_value = self._mock_response({"X-Frame-Options": "DENY"})
+        for content in ('["not", "a", "dict"]', '{"headers": {}}', '{"alias": "http://example-cache.com/other"}'):
+            with open(headers._cache_path(self.cache_dir, "http://example-cache.com/"), "w") as f:
+                f.write(content)
+            with open(headers._cache_path(self.cache_dir, "http://example-cache.com/other"), "w") as f:
+                f.write('{"checked_at": "yesterday"}')
+            results = headers.check_security_headers("http://example-cache.com/", cache_dir=self.cache_dir)
+            self.assertNotIn("error", results)
+            self.assertNotIn("cached", results)
+        self.assertEqual(mock_get.call_count, 3)
+
+    @patch('appsec_toolkit.checks.headers.requests.get')
+    def test_no_cache_dir_always_fetches(self, mock_get):
+        mock_get.return_value = self._mock_response({"X-Frame-Options": "DENY"})
+
+        headers.check_security_headers("http://example-cache.com/")
+        headers.check_security_headers("http://example-cache.com/")
+
+        self.assertEqual(mock_get.call_count, 2)
+
+
+class _FixtureSiteHandler(BaseHTTPRequestHandler):
+    """Serves a tiny site whose routes send different security headers."""
+
+    PAGES = {
+        "/": '<a href="/about">About</a><a href="/api/users">Users</a><a href="/private/admin">Admin</a>'
+             '<a href="http://other-origin.invalid/">Elsewhere</a>'
+             '<link href="/static/style.css"><script src="/static/app.js"></script><a href="/old-about">Old about</a>'
+             '<a href="http://[broken/">Broken</a>',
+        "/about": '<a href="/">Home</a><a href="/api/orders#latest">Orders</a>',
+    }
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        self.server.requested_paths.append(path)
+        if path == "/old-about":
+            self._redirect("/about")
+        elif path == "/moved":
+            # Another origin for the same server: localhost instead of 127.0.0.1
+            self._redirect(f"http://localhost:{self.server.server_address[1]}/")
+        elif path == "/robots.txt":
+            self._respond(200, "text/plain", "User-agent: *\nDisallow: /private/\n")
+        elif path in self.PAGES:
+            self._respond(200, "text/html", self.PAGES[path])
+        elif path.startswith("/static/"):
+            self._respond(200, "text/css", "body {}", {"X-Content-Type-Options": "nosniff"})
+        elif path.startswith("/api/"):
+            self._respond(200, "application/json", "[]", {"Content-Security-Policy": "default-src 'none'"})
+        else:
+            self._respond(404, "text/html", "Not found")
+
+    def _redirect(self, location):
+        self.send_response(301)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _respond(self, status, content_type, body, extra_headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHeaderCrawler(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _FixtureSiteHandler)
+        cls.server.requested_paths = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requested_paths.clear()
+
+    def test_crawl_groups_routes_by_header_profile(self):
+        results = headers.crawl_security_headers(self.base_url + "/")
+
+        self.assertEqual(results["errors"], [])
+        self.assertEqual(results["pages_crawled"], 6)
+        patterns = sorted(tuple(profile["route_patterns"]) for profile in results["profiles"])
+        self.assertEqual(patterns, [("/", "/about"), ("/api/*",), ("/static/*",)])
+        static_profile = next(p for p in results["profiles"] if p["route_patterns"] == ["/static/*"])
+        self.assertEqual(static_profile["found_headers"], {"X-Content-Type-Options": "nosniff"})
+        self.assertEqual(static_profile["routes"], ["/static/app.js", "/static/style.css"])
+
+    def test_crawl_reuses_one_session(self):
+        # Every fetch, robots.txt included, goes through the crawl's pooled session.
+        with patch.object(headers.requests, "get", side_effect=AssertionError("unpooled request")):
+            results = headers.crawl_security_headers(self.base_url + "/")
+        self.assertEqual(results["errors"], [])
+        self.assertEqual(results["pages_crawled"], 6)
+
+    def test_crawl_follows_redirected_start_page(self):
+        results = headers.crawl_security_headers(self.base_url + "/moved")
+
+        self.assertEqual(results["errors"], [])
+        self.assertEqual(results["pages_crawled"], 6)
+        routes = sorted(route for profile in results["profiles"] for route in profile["routes"])
+        self.assertIn("/", routes)
+        self.assertNotIn("/moved", routes)
+        self.assertEqual(results["skipped_by_robots"], [f"http://localhost:{self.server.server_address[1]}/private/admin"])
+
+    def test_crawl_does_not_fetch_redirect_targets_twice(self):
+        results = headers.crawl_security_headers(self.base_url + "/")
+
+        self.assertEqual(self.server.requested_paths.count("/about"), 1)
+        routes = [route for profile in results["profiles"] for route in profile["routes"]]
+        self.assertEqual(routes.count("/about"), 1)
+        self.assertNotIn("/old-about", routes)
+
+    def test_crawl_respects_robots_and_origin(self):
+        results = headers.crawl_security_headers(self.base_url + "/")
+
+        self.assertEqual(results["skipped_by_robots"], [self.base_url + "/private/admin"])
+        self.assertNotIn("/private/admin", self.server.requested_paths)
+
+    def test_crawl_ignoring_robots(self):
+        results = headers.crawl_security_headers(self.base_url + "/", respect_robots=False)
+
+        self.assertEqual(results["skipped_by_robots"], [])
+        self.assertIn("/private/admin", self.server.requested_paths)
+
+    def test_crawl_depth_and_page_limits(self):
+        results = headers.crawl_security_headers(self.base_url + "/", max_depth=0)
+        self.assertEqual(results["pages_crawled"], 1)
+
+        results = headers.crawl_security_headers(self.base_url + "/", max_pages=3)
+        self.assertEqual(results["pages_crawled"], 3)
+
 if __name__ == '__main__':
     # This allows running the tests directly if needed, e.g. python -m appsec_toolkit.tests.test_headers
     # However, it's more common to use a test runner like `python -m unittest discover`
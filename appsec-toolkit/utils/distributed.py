@@ -0,0 +1,303 @@
+import heapq
+import hmac
+import json
+import ipaddress
+import os
+import secrets
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+
+# Coordinator/worker mode for scanning file sets that are too large for one machine.
+# The coordinator splits the files into size-balanced work units and serves them over TCP;
+# workers pull one unit at a time. Messages are newline-delimited JSON:
+#   worker -> coordinator: {"type": "ready", "token": ...} or
+#                          {"type": "result", "unit_id": ..., "findings": [...], "errors": [...]}
+#   coordinator -> worker: {"type": "unit", "unit_id": ..., "files": [...]}, {"type": "wait", "seconds": ...},
+#                          {"type": "done"} or {"type": "error", "message": ...}
+# If the coordinator has a token, a worker's first message must carry it or the connection is refused.
+# There is no encryption: file paths and findings travel in plaintext, so keep the port on a trusted network.
+# "errors" lists files in the unit the worker couldn't read; wait() returns them next to the findings.
+# A message of the wrong shape is treated like a dropped connection.
+# Units held by a worker whose connection drops (or whose host stops answering TCP keepalives) are re-queued. Once the queue is empty, idle
+# workers steal (duplicate) the longest-running in-flight units so one slow worker can't hold
+# up the run; whichever copy finishes first wins.
+
+MAX_COPIES_PER_UNIT = 2
+WAIT_SECONDS = 0.1
+LIVENESS_POLL_SECONDS = 0.5  # how often wait() checks that workers are still around
+CONNECT_TIMEOUT = 30  # seconds a worker keeps retrying to reach the coordinator
+TOKEN_ENV_VAR = "APPSEC_SCAN_TOKEN"
+# TCP keepalive on worker connections: a worker host that stops answering is dropped after
+# roughly KEEPALIVE_IDLE + KEEPALIVE_INTERVAL * KEEPALIVE_COUNT seconds.
+KEEPALIVE_IDLE = 30
+KEEPALIVE_INTERVAL = 10
+KEEPALIVE_COUNT = 3
+
+
+def parse_address(value):
+    """Parses "host:port" into a (host, port) tuple."""
+    host, _, port = value.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Expected HOST:PORT, got {value!r}")
+    return host, int(port)
+
+
+def is_loopback(host):
+    """Whether host only accepts connections from this machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def make_token():
+    """Returns a random token for a coordinator that is reachable from other machines."""
+    return secrets.token_urlsafe(24)
+
+
+def make_work_units(paths, unit_count):
+    """
+    Splits paths into at most unit_count units of roughly equal total file size
+    (largest files first, each onto the currently lightest unit).
+    Returns a list of {"unit_id", "files", "bytes"} dictionaries, largest unit first.
+    """
+    sized = []
+    for path in paths:
+        try:
+            sized.append((os.path.getsize(path), path))
+        except OSError:
+            sized.append((0, path))
+    sized.sort(key=lambda item: (-item[0], item[1]))
+
+    bins = [(0, i, []) for i in range(max(1, min(unit_count, len(sized))))]
+    for size, path in sized:
+        total, i, files = heapq.heappop(bins)
+        files.append(path)
+        heapq.heappush(bins, (total + size, i, files))
+
+    bins = sorted((b for b in bins if b[2]), key=lambda b: (-b[0], b[1]))
+    return [{"unit_id": unit_id, "files": files, "bytes": total} for unit_id, (total, _, files) in enumerate(bins)]
+
+
+def _enable_keepalive(sock):
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # The tuning options are platform specific (Linux has all three); the OS defaults apply elsewhere.
+    for option, value in (("TCP_KEEPIDLE", KEEPALIVE_IDLE), ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL),
+                          ("TCP_KEEPCNT", KEEPALIVE_COUNT)):
+        if hasattr(socket, option):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+
+def _parse_message(line):
+    """Decodes one worker message, raising ValueError if it isn't of the expected shape."""
+    message = json.loads(line)
+    if not isinstance(message, dict):
+        raise ValueError("message is not an object")
+    if message.get("type") == "result":
+        findings, errors = message.get("findings", []), message.get("errors", [])
+        if not (isinstance(message.get("unit_id"), int)
+                and isinstance(findings, list) and all(isinstance(f, dict) for f in findings)
+                and isinstance(errors, list) and all(isinstance(e, str) for e in errors)):
+            raise ValueError("malformed result")
+    return message
+
+
+def _finding_order(finding):
+    return str(finding.get("file", "")), finding.get("line", 0), str(finding.get("check", "")), str(finding.get("finding", ""))
+
+
+class _WorkerConnectionHandler(socketserver.StreamRequestHandler):
+    """Serves work units to one connected worker."""
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        worker_id = f"{self.client_address[0]}:{self.client_address[1]}"
+        assigned = None
+        registered = False
+        try:
+            _enable_keepalive(self.connection)
+            for line in self.rfile:
+                message = _parse_message(line)
+                if not registered:
+                    if not coordinator._token_matches(message.get("token")):
+                        self._send({"type": "error", "message": "Invalid or missing token"})
+                        break
+                    coordinator._worker_joined()
+                    registered = True
+                if message.get("type") == "result":
+                    coordinator._complete(message["unit_id"], message.get("findings", []), message.get("errors", []))
+                    assigned = None
+
+                reply = coordinator._next_assignment(worker_id)
+                if reply["type"] == "unit":
+                    assigned = reply["unit_id"]
+                self._send(reply)
+                if reply["type"] == "done":
+                    break
+        except (OSError, ValueError, KeyError):
+            pass  # Treated like a dropped connection
+        finally:
+            if registered:
+                coordinator._worker_left(worker_id, assigned)
+
+    def _send(self, message):
+        self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class _CoordinatorServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class ScanCoordinator:
+    """
+    Hands work units to workers over TCP and merges their findings.
+    Call start(), point workers at .address, then wait() for the merged, ordered findings and any unit errors.
+    If token is set, only workers presenting the same token are served.
+    """
+
+    def __init__(self, units, address=("127.0.0.1", 0), token=None):
+        self.units = {unit["unit_id"]: unit for unit in units}
+        self._token = token
+        self._connected = 0  # workers currently connected
+        self._pending = deque(unit["unit_id"] for unit in units)
+        self._in_flight = {}  # unit_id -> {"workers": set of worker ids, "started": time}
+        self._results = {}    # unit_id -> (findings, errors)
+        self._condition = threading.Condition()
+        self._server = _CoordinatorServer(address, _WorkerConnectionHandler)
+        self._server.coordinator = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def wait(self, timeout=None, workers_alive=None):
+        """
+        Blocks until every unit has a result and returns (findings, errors): all findings, ordered by
+        file and line, and the files workers could not read (as "path: reason" strings), which were not scanned.
+        workers_alive is an optional callable reporting whether workers that haven't connected
+        yet (or are reconnecting) are still running, e.g. local worker processes. When it returns
+        False and no worker is connected, the remaining units can never finish and RuntimeError
+        is raised. Without it, the coordinator keeps waiting for workers to connect.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while len(self._results) < len(self.units):
+                outstanding = len(self.units) - len(self._results)
+                if workers_alive is not None and not self._connected and not workers_alive():
+                    raise RuntimeError(f"{outstanding} work units still outstanding but no workers are left")
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"{outstanding} work units still outstanding")
+                self._condition.wait(LIVENESS_POLL_SECONDS if remaining is None else min(remaining, LIVENESS_POLL_SECONDS))
+            findings = [finding for unit_id in sorted(self._results) for finding in self._results[unit_id][0]]
+            errors = [error for unit_id in sorted(self._results) for error in self._results[unit_id][1]]
+        return sorted(findings, key=_finding_order), errors
+
+    def _next_assignment(self, worker_id):
+        with self._condition:
+            if self._pending:
+                unit_id = self._pending.popleft()
+                self._in_flight[unit_id] = {"workers": {worker_id}, "started": time.monotonic()}
+                return {"type": "unit", "unit_id": unit_id, "files": self.units[unit_id]["files"]}
+
+            # Nothing queued: steal the longest-running unit this worker isn't already on.
+            candidates = [
+                (state["started"], unit_id) for unit_id, state in self._in_flight.items()
+                if worker_id not in state["workers"] and len(state["workers"]) < MAX_COPIES_PER_UNIT
+            ]
+            if candidates:
+                _, unit_id = min(candidates)
+                self._in_flight[unit_id]["workers"].add(worker_id)
+                return {"type": "unit", "unit_id": unit_id, "files": self.units[unit_id]["files"]}
+
+            if self._in_flight:
+                return {"type": "wait", "seconds": WAIT_SECONDS}
+            return {"type": "done"}
+
+    def _complete(self, unit_id, findings, errors):
+        with self._condition:
+            if unit_id in self._results or unit_id not in self.units:
+                return  # A stolen copy already finished this unit
+            self._results[unit_id] = (findings, errors)
+            self._in_flight.pop(unit_id, None)
+            self._condition.notify_all()
+
+    def _token_matches(self, token):
+        if self._token is None:
+            return True
+        return isinstance(token, str) and hmac.compare_digest(token.encode("utf-8"), self._token.encode("utf-8"))
+
+    def _worker_joined(self):
+        with self._condition:
+            self._connected += 1
+
+    def _worker_left(self, worker_id, unit_id):
+        with self._condition:
+            self._connected -= 1
+            self._condition.notify_all()  # Lets wait() notice if this was the last worker
+            state = self._in_flight.get(unit_id)
+            if state is None:
+                return
+            state["workers"].discard(worker_id)
+            if not state["workers"]:
+                # Nobody else is working on it, so put it back at the front of the queue.
+                del self._in_flight[unit_id]
+                self._pending.appendleft(unit_id)
+
+
+def run_worker(address, scan_files, connect_timeout=CONNECT_TIMEOUT, token=None):
+    """
+    Connects to a coordinator at address ((host, port)) and scans work units until told to stop.
+    scan_files is called with a list of file paths and must return (findings, errors): a list of
+    JSON-serialisable finding dictionaries and a list of strings for files it could not read.
+    token must match the coordinator's token, if it has one; otherwise RuntimeError is raised.
+    Returns the number of units this worker scanned.
+    """
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            sock = socket.create_connection(address)
+            break
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(WAIT_SECONDS)
+
+    units_scanned = 0
+    with sock, sock.makefile("rb") as reader, sock.makefile("wb") as writer:
+        def send(message):
+            writer.write(json.dumps(message).encode("utf-8") + b"\n")
+            writer.flush()
+
+        send({"type": "ready", "token": token})
+        for line in reader:
+            message = json.loads(line)
+            if message["type"] == "error":
+                raise RuntimeError(f"Coordinator refused this worker: {message.get('message')}")
+            if message["type"] == "done":
+                break
+            if message["type"] == "wait":
+                time.sleep(message.get("seconds", WAIT_SECONDS))
+                send({"type": "ready"})
+            elif message["type"] == "unit":
+                findings, errors = scan_files(message["files"])
+                units_scanned += 1
+                send({"type": "result", "unit_id": message["unit_id"], "findings": findings, "errors": errors})
+    return units_scanned